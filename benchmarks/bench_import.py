@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+############################################################################################################
+# Start up time of calval-timeseries. Run from the repository root with: python -m benchmarks.bench_import
+############################################################################################################
+import sys
+import time
+import argparse
+import subprocess
+
+heavy = ['numpy', 'pandas', 'scipy', 'matplotlib', 'dateutil']
+
+# Each case runs in a fresh interpreter and prints the heavy modules it imported
+cases = {'import': "import timeseries._main",
+         'help': "import sys; sys.argv = ['calval-timeseries', '--help']\n"
+                 "from timeseries._main import main\n"
+                 "try:\n    main()\nexcept SystemExit:\n    pass",
+         'bad-index': "import sys; sys.argv = ['calval-timeseries', '--harv', 'sat.txt', '-i', 'l_bad']\n"
+                      "from timeseries._main import main\n"
+                      "try:\n    main()\nexcept SystemExit:\n    pass"}
+report = "\nimport sys; print('|'.join(m for m in {} if m in sys.modules), file=sys.stderr)".format(heavy)
+
+
+def run_case(code, repeat):
+    """ Function to time a case in repeat fresh interpreters. Returns the median time in ms and the heavy modules
+    imported. """
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', code + report], stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        times.append((time.perf_counter() - t0) * 1000)
+    modules = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ''
+    return sorted(times)[len(times) // 2], [m for m in modules.split('|') if m]
+
+
+def main():
+    """ Main function for the start up benchmark """
+    parser = argparse.ArgumentParser(description='Time the start up of calval-timeseries.')
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='Interpreters started per case. Default is 5.')
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='Fail if the median time of a case is above this many milliseconds.')
+    args = parser.parse_args()
+
+    baseline, _ = run_case('pass', args.repeat)
+    print('{:<10} {:>10} {:>10}  {}'.format('case', 'ms', 'over py', 'heavy modules imported'))
+    print('{:<10} {:>10.1f} {:>10}  {}'.format('python', baseline, '', ''))
+    failed = False
+    for name, code in cases.items():
+        ms, modules = run_case(code, args.repeat)
+        print('{:<10} {:>10.1f} {:>10.1f}  {}'.format(name, ms, ms - baseline, ', '.join(modules) or '-'))
+        if modules or (args.max_ms is not None and ms > args.max_ms):
+            failed = True
+    if failed:
+        print('Start up regression: heavy modules imported or time above --max-ms.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+############################################################################################################
+# Peak memory of averaging overflights against the length of the overflight list. Run from the repository root with:
+#   python -m benchmarks.bench_memory [--days N] [--rate HZ] [--lengths 8,32,128] [--max-growth-mb MB]
+############################################################################################################
+import io
+import sys
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+import datetime as dt
+from contextlib import redirect_stdout
+from . import synthetic
+
+
+def crossing_times(start, days, n):
+    """ Function to list n overflight times cycling through the days from start, half an hour before and after each
+    midnight, so every LiDAR window runs into the next day. """
+    times = []
+    for i in range(n):
+        midnight = dt.datetime.combine(start, dt.time()) + dt.timedelta(days=1 + (i // 2) % (days - 1))
+        times.append(midnight + dt.timedelta(minutes=30 if i % 2 else -30))
+    return times
+
+
+def measure(paths, start, days, n, cache_mb, window_mb):
+    """ Function to average n overflights in this process. Returns the peak resident memory of the process in MB. """
+    from timeseries import overflight
+    harv = paths['harv']
+    with redirect_stdout(io.StringIO()):
+        overflight.ovavg_times(crossing_times(start, days, n), 'harv', harv['six_minute'], harv['uls'],
+                               cache_mb=cache_mb, window_mb=window_mb)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kilobytes on Linux
+
+
+def main():
+    """ Main function for the memory benchmark """
+    parser = argparse.ArgumentParser(description='Check that the peak memory of averaging overflights does not grow '
+                                                 'with the number of overflights.')
+    parser.add_argument('--days', type=int, default=4, help='Days of synthetic data. Default is 4.')
+    parser.add_argument('--rate', type=float, default=10., help='Raw LiDAR records per second. Default is 10.')
+    parser.add_argument('--lengths', type=str, default='8,32,128',
+                        help='Comma separated numbers of overflights to average, each in a fresh process. Default is '
+                             '8,32,128.')
+    parser.add_argument('--cache-mb', type=float, default=32, help='Raw LiDAR day cache limit. Default is 32.')
+    parser.add_argument('--window-mb', type=float, default=64, help='LiDAR window buffer budget. Default is 64.')
+    parser.add_argument('--max-growth-mb', type=float, default=16,
+                        help='Fail if the peak memory of the longest list is more than this many MB above that of the '
+                             'shortest. Default is 16.')
+    parser.add_argument('--data', type=str, default=None,
+                        help='Directory for the synthetic data, kept and reused between runs. Default is a temporary '
+                             'directory which is removed.')
+    parser.add_argument('--measure', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    start = dt.date(2019, 1, 1)
+    if args.measure is not None:
+        paths = synthetic.make_paths(args.data, start, args.days, args.rate)
+        print(measure(paths, start, args.days, args.measure, args.cache_mb, args.window_mb))
+        return
+
+    root = args.data if args.data is not None else tempfile.mkdtemp(prefix='calval-bench-')
+    try:
+        config = {'days': args.days, 'rate': args.rate, 'benchmark': 'memory'}
+        if not synthetic.reuse_dataset(root, config):
+            print('Writing synthetic data to:', root)
+            synthetic.make_dataset(root, start, args.days, args.rate)
+            synthetic.save_config(root, config)
+
+        # ru_maxrss only grows, so each list is averaged in a fresh interpreter
+        peaks = []
+        print('{:>12} {:>10} {:>10}'.format('overflights', 'peak MB', 'growth MB'))
+        for n in [int(n) for n in args.lengths.split(',')]:
+            proc = subprocess.run([sys.executable, '-m', 'benchmarks.bench_memory', '--measure', str(n), '--data',
+                                   root, '--days', str(args.days), '--rate', str(args.rate), '--cache-mb',
+                                   str(args.cache_mb), '--window-mb', str(args.window_mb)],
+                                  stdout=subprocess.PIPE, universal_newlines=True, check=True)
+            peaks.append(float(proc.stdout.strip().splitlines()[-1]))
+            print('{:>12} {:>10.1f} {:>10.1f}'.format(n, peaks[-1], peaks[-1] - peaks[0]))
+        if peaks[-1] - peaks[0] > args.max_growth_mb:
+            print('Memory regression: peak memory grows with the number of overflights.')
+            sys.exit(1)
+    finally:
+        if args.data is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+############################################################################################################
+# Timing and peak memory of each stage on a synthetic data set. Run from the repository root with:
+#   python -m benchmarks.bench_stages [--days N] [--rate HZ] [--save results.json] [--compare old.json]
+############################################################################################################
+import os
+import io
+import glob
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import datetime as dt
+import tracemalloc
+from contextlib import redirect_stdout
+import numpy as np
+from timeseries import loading, overflight, reg, bias, sixmin
+from . import synthetic
+
+
+def clear_parsed(paths):
+    """ Function to make the six minute files cold: drop the parsed files kept in memory and the binary copies. """
+    loading._parsed.clear()
+    for loc in ('harv', 'cata'):
+        for f in glob.glob(os.path.join(paths[loc]['six_minute'], '*.npz')):
+            os.remove(f)
+
+
+def stages(paths, dpi):
+    """ Function to build the benchmarked stages as name: (setup, run) pairs of functions. """
+    harv = paths['harv']
+    days = sorted(glob.glob(os.path.join(harv['uls'], 'uls_*.bin.*')))
+    day_xz = dt.datetime.strptime(os.path.basename([f for f in days if f.endswith('.xz')][0])[4:12], '%Y%m%d')
+    day_gz = dt.datetime.strptime(os.path.basename([f for f in days if f.endswith('.gz')][0])[4:12], '%Y%m%d')
+    times = paths['times']
+
+    def raw_windows():
+        for t in times:
+            day = dt.datetime.combine(t.date(), dt.time())
+            t1, t2 = (t - day).total_seconds() - 7200, (t - day).total_seconds() + 7200
+            loading.load_raw_window(day, t1, t2, harv['uls'], frame=False)
+
+    # Ragged windows like the 2 hour fits of the overflights, at the rate of the raw data
+    rng = np.random.default_rng(0)
+    n = rng.integers(1, int(paths['rate'] * 14400), len(times) * 8)
+    offsets = np.concatenate([[0], np.cumsum(n)])
+    x = rng.uniform(-2, 2, offsets[-1])
+    y = 20 + 0.1 * x + 0.01 * x * x + rng.normal(0, 0.05, offsets[-1])
+
+    def plots():
+        from timeseries import harv_ts
+        data = loading.load_harv(harv['overflights'], harv['sat'], paths['wind'], 'l_6m_quad2h')
+        time, lid, rpw, rad, bub, ssh, benchmark, backscatter, swh, wind = data
+        harv_ts.raw_lidar(ssh, benchmark, lid, time, os.path.join(paths['root'], 'TS_RawLiDAR.png'), dpi)
+
+    def nothing():
+        pass
+
+    raw_xz = {}
+
+    def load_xz():
+        raw_xz.update(loading.load_raw(day_xz, harv['uls'], frame=False))
+
+    return {
+        'load_raw_xz': (nothing, lambda: loading.load_raw(day_xz, harv['uls'], frame=False)),
+        'load_raw_gz': (nothing, lambda: loading.load_raw(day_gz, harv['uls'], frame=False)),
+        'raw_windows': (nothing, raw_windows),
+        'sixmin_parse': (lambda: clear_parsed(paths),
+                         lambda: loading.load_output(times[0], 'harv', harv['six_minute'])),
+        'ovavg_harv': (lambda: clear_parsed(paths),
+                       lambda: overflight.ovavg(harv['sat'], 'harv', harv['six_minute'], harv['uls'])),
+        'ovavg_cata': (lambda: clear_parsed(paths),
+                       lambda: overflight.ovavg(paths['cata']['sat'], 'cata', paths['cata']['six_minute'],
+                                                paths['cata']['uls'])),
+        'sixmin_bin': (load_xz, lambda: sixmin.bin_day(raw_xz, day_xz)),
+        'polyfit_windows': (nothing, lambda: reg.polyfit_windows(x, y, offsets, 2)),
+        'load_harv': (nothing, lambda: loading.load_harv(harv['overflights'], harv['sat'], paths['wind'],
+                                                         'l_6m_quad2h')),
+        'load_cata': (nothing, lambda: loading.load_cata(paths['cata']['overflights'], paths['cata']['sat'],
+                                                         'l_6m_quad2h')),
+        'harv_stats': (nothing, lambda: bias.harv_stats(*harv_inputs(paths))),
+        'plot': (nothing, plots),
+    }
+
+
+def harv_inputs(paths):
+    """ Function to load the Harvest inputs of bias.harv_stats. """
+    with redirect_stdout(io.StringIO()):
+        time, lid, rpw, rad, bub, ssh, benchmark, backscatter, swh, wind = \
+            loading.load_harv(paths['harv']['overflights'], paths['harv']['sat'], paths['wind'], 'l_6m_quad2h')
+    return ssh, benchmark, lid, rpw, rad, bub, swh, wind, time
+
+
+def measure(setup, run, repeat):
+    """ Function to time repeat runs of a stage, each after its setup, and then measure the peak of the memory
+    allocated through Python (which includes numpy arrays) in one more run. Returns the median and minimum time in
+    seconds and the peak memory in MB. """
+    times = []
+    with redirect_stdout(io.StringIO()):
+        for i in range(repeat):
+            setup()
+            t0 = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - t0)
+        setup()
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return float(np.median(times)), min(times), peak / 2 ** 20
+
+
+def main():
+    """ Main function for the stage benchmarks """
+    parser = argparse.ArgumentParser(description='Time the stages of calval-timeseries on synthetic data.')
+    parser.add_argument('--days', type=int, default=4, help='Days of synthetic data. Default is 4.')
+    parser.add_argument('--rate', type=float, default=10., help='Raw LiDAR records per second. Default is 10.')
+    parser.add_argument('--per-day', type=int, default=1, help='Overflights per day. Default is 1.')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='Timed runs per stage. Default is 3.')
+    parser.add_argument('--dpi', type=int, default=500, help='Resolution of the benchmarked plot. Default is 500.')
+    parser.add_argument('--stages', type=str, default=None, help='Comma separated stages to run. Default is all.')
+    parser.add_argument('--data', type=str, default=None,
+                        help='Directory for the synthetic data, kept and reused between runs. Default is a temporary '
+                             'directory which is removed.')
+    parser.add_argument('--save', type=str, default=None, help='Write the results to this JSON file.')
+    parser.add_argument('--compare', type=str, default=None, help='JSON file of earlier results to compare with.')
+    args = parser.parse_args()
+
+    root = args.data if args.data is not None else tempfile.mkdtemp(prefix='calval-bench-')
+    try:
+        config = {'days': args.days, 'rate': args.rate, 'per_day': args.per_day}
+        if synthetic.reuse_dataset(root, dict(config, benchmark='stages')):
+            paths = synthetic.make_paths(root, **config)
+        else:
+            print('Writing synthetic data to:', root)
+            paths = synthetic.make_dataset(root, **config)
+            with redirect_stdout(io.StringIO()):
+                for loc in ('harv', 'cata'):
+                    p = paths[loc]
+                    overflight.ovload(p['sat'], loc, p['six_minute'], p['uls'], p['overflights'])
+            synthetic.save_config(root, dict(config, benchmark='stages'))
+        paths['rate'] = args.rate
+
+        results = {}
+        todo = stages(paths, args.dpi)
+        names = list(todo) if args.stages is None else args.stages.split(',')
+        old = json.load(open(args.compare)) if args.compare is not None else {}
+        print('{:<16} {:>10} {:>10} {:>10} {:>8}'.format('stage', 'median s', 'min s', 'peak MB', 'vs old'))
+        for name in names:
+            median, fastest, peak = measure(*todo[name], args.repeat)
+            results[name] = {'median_s': median, 'min_s': fastest, 'peak_mb': peak}
+            ratio = '%.2fx' % (median / old[name]['median_s']) if name in old else ''
+            print('{:<16} {:>10.4f} {:>10.4f} {:>10.1f} {:>8}'.format(name, median, fastest, peak, ratio))
+        if args.save is not None:
+            with open(args.save, 'w') as f:
+                json.dump(results, f, indent=2)
+            print('Results saved to:', args.save)
+    finally:
+        if args.data is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+############################################################################################################
+# Generators of synthetic inputs in the layout of /srv/data/harvest, for benchmarks away from the data server
+############################################################################################################
+import os
+import sys
+import gzip
+import json
+import shutil
+import lzma
+import datetime as dt
+import numpy as np
+from timeseries import loading
+
+names_harv = ['D1', 'F1', 'L1_1', 'L1_2', 'N1_1', 'N1_1_ssh', 'N1_2', 'P6', 'U1', 'W1', 'Y1_1', 'Y1_1_ssh', 'Y1_2', 'l',
+              'l_Hs', 'l_rpw', 'l_max', 'l_mean', 'l_median', 'l_min', 'l_n', 'l_skew', 'l_ssh', 'l_std']
+names_cata = ['A1', 'A1_t1', 'A1_t2', 'B1', 'E1', 'F1', 'L1_1', 'L1_2', 'P6', 'U1', 'W1', 'l', 'l_Hs', 'l_rpw', 'l_max',
+              'l_mean', 'l_median', 'l_min', 'l_n', 'l_skew', 'l_std']
+J2000 = dt.datetime(2000, 1, 1, 12)
+
+
+def tide(t):
+    """ Synthetic sea level in m at t seconds since 2000, from the M2 and K1 constituents. """
+    return 0.6 * np.sin(2 * np.pi * t / 44714.) + 0.3 * np.sin(2 * np.pi * t / 86164. + 1.)
+
+
+########################## Raw LiDAR ########################################################################
+def write_uls(rawdir, day, rate=10., compression='xz', gap=0.02, rng=None):
+    """ Function to write a raw LiDAR day file uls_%Y%m%d.bin.xz/gz of 12 byte records at about rate records per
+    second, with the fraction gap of the day missing in dropouts. Returns the file name. """
+    rng = np.random.default_rng() if rng is None else rng
+    n = int(86400 * rate)
+    ticks = np.sort(rng.integers(0, 864000000, n)).astype(np.uint32)
+    if gap > 0:
+        start = rng.integers(0, 864000000)
+        ticks = ticks[(ticks < start) | (ticks > start + gap * 864000000)]
+    t = (dt.datetime.combine(day, dt.time()) - J2000).total_seconds() + ticks / 10000
+    height = 20. - tide(t) + rng.normal(0, 0.4, len(ticks))  # Range from the platform to the sea surface in m
+    data = np.empty(len(ticks), dtype=loading.raw_dtype)
+    data['time'] = ticks
+    data['range'] = np.round(height * 1000)
+    data['rpw'] = rng.integers(3000, 4000, len(ticks))
+    f = os.path.join(rawdir, day.strftime('uls_%Y%m%d.bin.') + compression)
+    if compression == 'gz':
+        content = gzip.compress(data.tobytes(), compresslevel=1)
+    else:
+        content = lzma.compress(data.tobytes(), preset=1)
+    # Low compression levels write much faster, and decompression speed depends little on the level
+    with open(f, 'wb') as nf:
+        nf.write(content)
+    return f
+
+
+########################## Six Minute Data ##################################################################
+def write_sixmin(outdir, loc, month, missing=0.001, rng=None):
+    """ Function to write the monthly six minute file {loc}_%Y%m.csv of the month of the date month, with the
+    fraction missing of the values written as missing. Returns the file name. """
+    rng = np.random.default_rng() if rng is None else rng
+    names = names_harv if loc == 'harv' else names_cata
+    start = dt.datetime(month.year, month.month, 1)
+    end = dt.datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+    n = int((end - start).total_seconds() // 360)
+    t = (start - J2000).total_seconds() + 360. * np.arange(n)
+    values = 20. + tide(t)[:, None] + rng.normal(0, 0.02, (n, len(names)))
+    text = np.char.mod('%.4f', values).astype(object)
+    text[rng.random(values.shape) < missing] = '   -   '
+    times = (np.datetime64(start, 's') + 360 * np.arange(n)).astype(str)
+    f = os.path.join(outdir, loc + '_' + start.strftime('%Y%m') + '.csv')
+    with open(f, 'w') as out:
+        out.write(','.join(['time'] + names) + '\n')
+        for time, row in zip(times, text):
+            out.write(time.replace('T', ' ') + ',' + ','.join(row) + '\n')
+    return f
+
+
+########################## Wind and Satellite Data ##########################################################
+def write_wind(f, start, end, rng=None):
+    """ Function to write a CO-OPS wind file with six minute wind speeds from start to end. """
+    rng = np.random.default_rng() if rng is None else rng
+    n = int((end - start).total_seconds() // 360)
+    wspd = np.abs(5 + np.cumsum(rng.normal(0, 0.3, n)))
+    with open(f, 'w') as out:
+        out.write('#YY  MM DD hh mm WDIR WSPD GDR GST GTIME\n#yr  mo dy hr mn degT m/s degT m/s hhmm\n')
+        for i in range(n):
+            t = start + dt.timedelta(seconds=360 * i)
+            out.write('%4d %02d %02d %02d %02d %3d %4.1f %3d %4.1f %s\n' %
+                      (t.year, t.month, t.day, t.hour, t.minute, rng.integers(0, 360), wspd[i], 210, wspd[i] * 1.3,
+                       t.strftime('%H%M')))
+
+
+def overflight_times(start, days, per_day=1, rng=None):
+    """ Function to draw per_day overflight times a day, at least 2 hours from the ends of the days from start. """
+    rng = np.random.default_rng() if rng is None else rng
+    secs = np.sort(rng.uniform(7200, 86400 - 7200, (days, per_day)), axis=1)
+    return [start + dt.timedelta(days=i, seconds=float(s)) for i in range(days) for s in secs[i]]
+
+
+def write_satellite(f, loc, times, rng=None):
+    """ Function to write a satellite data file for the overflight times. Harvest files start with seconds since
+    J2000 and hold ssh, benchmark, backscatter and swh, Catalina files start with a date and time and hold ssh,
+    corr, swh and backscatter. """
+    rng = np.random.default_rng() if rng is None else rng
+    with open(f, 'w') as out:
+        for t in times:
+            if loc == 'harv':
+                out.write('%.6f %.4f %.4f %.3f %.3f\n' % ((t - J2000).total_seconds(), rng.normal(-13, .05), 6.9,
+                                                          rng.uniform(10, 17), rng.uniform(0.3, 3)))
+            else:
+                out.write('%s %.4f %.4f %.3f %.3f\n' % (t.strftime('%Y-%m-%d %H:%M:%S.%f'), rng.normal(100, 20), 3.0,
+                                                        rng.uniform(0.3, 3), rng.uniform(10, 17)))
+
+
+########################## Data Set ##########################################################################
+def reuse_dataset(root, config):
+    """ Function to check whether root holds a data set written by a benchmark with the options in config, which the
+    benchmark records in root/config.json. Returns True to reuse it. Otherwise root is cleared for a new data set, but
+    only when a benchmark wrote it (it has a config.json) or it is empty: any other directory is refused. """
+    fconfig = os.path.join(root, 'config.json')
+    if os.path.exists(fconfig):
+        with open(fconfig) as f:
+            if json.load(f) == config:
+                return True
+        shutil.rmtree(root)
+    elif os.path.isdir(root) and os.listdir(root):
+        print('Refusing to write synthetic data to the non empty directory without a config.json:', root)
+        sys.exit(1)
+    return False
+
+
+def save_config(root, config):
+    """ Function to record in root/config.json the options of the data set just written there, for reuse_dataset. """
+    with open(os.path.join(root, 'config.json'), 'w') as f:
+        json.dump(config, f)
+
+
+def make_paths(root, start=dt.date(2019, 1, 1), days=8, rate=10., per_day=1, seed=0):
+    """ Function to return a dictionary of the paths of a data set written by make_dataset, in the layout used by
+    _main, and its overflight times. """
+    paths = {'root': root, 'wind': os.path.join(root, 'harv', 'co-ops', 'wind.txt'),
+             'times': overflight_times(dt.datetime.combine(start, dt.time()), days, per_day,
+                                       np.random.default_rng(seed))}
+    for loc in ('harv', 'cata'):
+        paths[loc] = {'uls': os.path.join(root, loc, 'uls'), 'six_minute': os.path.join(root, loc, 'six_minute'),
+                      'sat': os.path.join(root, 'sat_' + loc + '.txt'),
+                      'overflights': os.path.join(root, loc, 'lidardata_overflights.csv')}
+    return paths
+
+
+def make_dataset(root, start=dt.date(2019, 1, 1), days=8, rate=10., per_day=1, seed=0):
+    """ Function to write a complete synthetic data set under root: raw LiDAR day files (alternating xz and gz, with
+    one extra day for windows after the last overflight), six minute files, the wind file and satellite files for
+    both sites. Returns the paths from make_paths. """
+    paths = make_paths(root, start, days, rate, per_day, seed)
+    rng = np.random.default_rng(seed + 1)
+    for loc in ('harv', 'cata'):
+        p = paths[loc]
+        os.makedirs(p['uls'], exist_ok=True)
+        os.makedirs(p['six_minute'], exist_ok=True)
+        for i in range(days + 1):
+            write_uls(p['uls'], start + dt.timedelta(days=i), rate, ('xz', 'gz')[i % 2], rng=rng)
+        months = sorted({(d.year, d.month) for d in (start + dt.timedelta(days=i) for i in range(days + 1))})
+        for year, month in months:
+            write_sixmin(p['six_minute'], loc, dt.date(year, month, 1), rng=rng)
+        write_satellite(p['sat'], loc, paths['times'], rng)
+    os.makedirs(os.path.dirname(paths['wind']), exist_ok=True)
+    write_wind(paths['wind'], dt.datetime.combine(start, dt.time()) - dt.timedelta(days=1),
+               dt.datetime.combine(start, dt.time()) + dt.timedelta(days=days + 2), rng)
+    return paths
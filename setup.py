@@ -23,10 +23,10 @@ setup(
     description="Set of tools for time series analysis of Altimetry data calibration and validation"
                 " at Harvest and Catalina ",
     long_description=read('README.rst'),
-    scripts=['bin/calval-timeseries'],
+    scripts=['bin/calval-timeseries', 'bin/calval-archive'],
     license='custom',
     url='https://github.com/ccarocean/calval-timeseries',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     install_requires=[
         "numpy",
         "matplotlib",
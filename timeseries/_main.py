@@ -7,7 +7,21 @@
 import os
 import sys
 import argparse
-from . import loading, cata_ts, harv_ts, overflight
+
+
+lidar_indices = ['l_6m_quad2h', 'l_mean', 'l_lin1100', 'l_quad2h']
+
+
+def plot_options(args):
+    """ Returns the keyword arguments of the plot functions """
+    return {'dpi': args.dpi, 'bootstrap': bootstrap_options(args, 1)}
+
+
+def bootstrap_options(args, jobs):
+    """ Returns the bootstrap.intervals options of the slope intervals, or None without --bootstrap """
+    if args.bootstrap <= 0:
+        return None
+    return {'replicates': args.bootstrap, 'block': args.block_length, 'jobs': jobs}
 
 
 def main():
@@ -24,78 +38,323 @@ def main():
                              ' on the 6 minute data. l_mean is an average of 2200 seconds of data around the '
                              'overflight. l_lin1100 is a linear regression of 2200 seconds of data around the '
                              'overflight. l_quad2h is a quadratic regression of 4 hours of data around the overflight. '
-                             'l_6m_quad2h is the default value. ')
+                             'l_6m_quad2h is the default value. Several comma separated indices, or all, load the data '
+                             'once and write the statistics of the LiDAR series for every index side by side to '
+                             'bias_stats_indices.csv, with one set of LiDAR plots per index.')
     parser.add_argument('-l', '--load', action="store_true", default=None,
                         help="Loads and averages LiDAR data. This is for when new overflight data is available. ")
+    parser.add_argument('--incremental', action='store_true',
+                        help='With --load, only average overflights which are new or whose raw or six minute data '
+                             'files changed since the last load, and keep the rest of the overflight file.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes used to average overflights when loading and to create the '
+                             'plots, shared between the sites, which run at the same time. Default is 1.')
+    parser.add_argument('--dpi', type=int, default=500, help='Resolution of the saved plots. Default is 500.')
+    parser.add_argument('--cache-mb', type=float, default=512,
+                        help='Memory limit in megabytes of the decoded raw LiDAR day cache used when loading (per '
+                             'worker process). Default is 512.')
+    parser.add_argument('--window-mb', type=float, default=64,
+                        help='Memory budget in megabytes of the buffer the raw LiDAR window of each overflight is '
+                             'assembled in when loading (per worker process). Larger windows use a temporary buffer. '
+                             'Default is 64.')
+    parser.add_argument('--no-plots', action='store_true',
+                        help='Only compute the bias statistics and write them to bias_stats.json and the bias of '
+                             'every pass to bias_series.csv in the time series directory, without creating plots. '
+                             'With several LiDAR indices only bias_stats_indices.csv is written.')
+    parser.add_argument('--bootstrap', type=int, default=0, metavar='N',
+                        help='Compute a 95%% confidence interval of the trend slope of every bias series from N '
+                             'bootstrap replicates, shown on the plots and written to bias_stats.json with --no-plots '
+                             'and to bias_stats_indices.csv with several LiDAR indices.')
+    parser.add_argument('--block-length', type=int, default=1,
+                        help='Resample blocks of this many consecutive passes in the bootstrap. Default is 1.')
+    parser.add_argument('--store', type=str, default=None, metavar='DB',
+                        help='Save the averaged overflights to the SQLite database DB when loading, and read them from '
+                             'it for the time series, instead of the lidardata_overflights.csv files.')
+    parser.add_argument('--mission', type=str, default='j3',
+                        help='Mission the overflights belong to in the --store database. Default is j3.')
+    parser.add_argument('--run', type=str, action='append', default=[], metavar='SITE:MISSION:FILE',
+                        help='Also create the time series of the overflights of another mission at a site (harv or '
+                             'cata) from the satellite data FILE. Can be given several times. Its overflights go to '
+                             'lidardata_overflights_MISSION.csv and its time series to the MISSION directory of the '
+                             'site time series directory. All runs share the data they have in common and run at the '
+                             'same time with --jobs.')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and watch the satellite files and the raw LiDAR and six minute data '
+                             'directories. When files are new or changed and have not changed for --settle seconds, '
+                             'the overflights using them are averaged again and the time series are updated. Implies '
+                             '--load --incremental.')
+    parser.add_argument('--poll', type=float, default=10,
+                        help='Seconds between checks of the watched files. Default is 10.')
+    parser.add_argument('--settle', type=float, default=20,
+                        help='Seconds a watched file must stay unchanged before it is used. Default is 20.')
+    parser.add_argument('--profile', type=str, default=None, metavar='REPORT',
+                        help='Record the wall time, CPU time, bytes read and decompressed, rows parsed and points fit '
+                             'of each stage and overflight, and write them to the JSON file REPORT and a CSV file '
+                             'next to it.')
+    parser.add_argument('--cprofile', type=str, default=None, metavar='FILE',
+                        help='Write cProfile statistics of the main process to FILE.')
 
     args = parser.parse_args()
-    if args.harv is None and args.cata is None:
+    if args.harv is None and args.cata is None and not args.run:
         print("--harv or --cata is required for use.")
         sys.exit(0)
+    if any(run.count(':') < 2 or run.split(':', 1)[0] not in ('harv', 'cata') for run in args.run):
+        print('Not a valid run. Use SITE:MISSION:FILE with a site of harv or cata.')
+        sys.exit(0)
 
-    if args.lidarindex not in ['l_6m_quad2h', 'l_mean', 'l_lin1100', 'l_quad2h']:
+    indices = lidar_indices if args.lidarindex == 'all' else args.lidarindex.split(',')
+    if any(index not in lidar_indices for index in indices):
         print('Not a valid lidar index. ')
         sys.exit(0)
+    ind_lid = indices[0] if len(indices) == 1 else indices
+
+    if args.cprofile is not None:
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+
+    # Import the analysis modules only now, so --help and argument errors do not pay for numpy, pandas and scipy
+    from . import profiling
+    profiling.enable(args.profile is not None)
+
+    if args.watch:
+        # Watching keeps the overflight file up to date, so only the overflights with new data are averaged
+        args.load, args.incremental = True, True
+        patterns = []
+        for loc, mission, f_sat in site_runs(args):
+            paths = site_paths(args, loc, mission)
+            patterns += [f_sat, os.path.join(paths['rawdir'], 'uls_*.bin.gz'),
+                         os.path.join(paths['rawdir'], 'uls_*.bin.xz'),
+                         os.path.join(paths['outdir'], loc + '_*.csv')]
+        patterns = sorted(set(patterns))
+        from . import watch
+        watch.watch(patterns, lambda: process(args, indices, ind_lid), args.poll, args.settle)
+    else:
+        process(args, indices, ind_lid)
 
+    if args.profile is not None:
+        profiling.write_report(args.profile)
+    if args.cprofile is not None:
+        prof.disable()
+        prof.dump_stats(args.cprofile)
+        print('cProfile statistics saved to:', args.cprofile)
+
+
+def process(args, indices, ind_lid):
+    """ Function to load the overflights if requested and create the time series of every run, as a graph of
+    pipeline tasks which overlap with --jobs. One task per site runs at a time, and each task gets its share of
+    --jobs for its own worker processes, so no more than --jobs processes are busy. """
+    from . import pipeline
+    nsites = len(set(site for site, _, _ in site_runs(args)))
+    pipeline.run(pipeline_tasks(args, indices, ind_lid), min(args.jobs, nsites))
+
+
+def site_runs(args):
+    """ Returns the (site, mission, satellite file) of every run: --harv and --cata for --mission, then --run """
+    runs = [(site, args.mission, f_sat) for site, f_sat in (('harv', args.harv), ('cata', args.cata))
+            if f_sat is not None]
+    for run in args.run:
+        site, mission, f_sat = run.split(':', 2)
+        runs.append((site, mission, f_sat))
+    return runs
+
+
+def site_paths(args, site, mission):
+    """ Returns the data files and output directory of a run. Missions other than --mission have their own overflight
+    files and time series directory. """
     datafile = os.getenv('LIDARDATAFILE', os.path.join('/', 'srv', 'data', 'harvest'))
+    suffix = '' if mission == args.mission else '_' + mission
+    dir_ts = os.path.join('/', 'srv', 'data', 'harvest', 'timeseries', site)
+    return {'rawdir': os.path.join(datafile, site, 'uls'),
+            'outdir': os.path.join(datafile, site, 'six_minute'),
+            'ov_outfile': os.path.join(datafile, site, 'lidardata_overflights' + suffix + '.csv'),
+            'f_lid': os.path.join('/', 'srv', 'data', 'harvest', site, 'lidardata_overflights' + suffix + '.csv'),
+            'dir_ts': dir_ts if mission == args.mission else os.path.join(dir_ts, mission)}
 
-    f_lid_harv = os.path.join('/', 'srv', 'data', 'harvest', 'harv', 'lidardata_overflights.csv')
-    f_wind = os.path.join('/', 'srv', 'data', 'harvest', 'harv', 'co-ops', 'wind.txt')
-    f_lid_cata = os.path.join('/', 'srv', 'data', 'harvest', 'cata', 'lidardata_overflights.csv')
-    dir_ts = os.path.join('/', 'srv', 'data', 'harvest', 'timeseries')
 
-    if args.harv is not None:
-        if args.load is not None:
-            rawdir = os.path.join(datafile, 'harv', 'uls')
-            ov_outfile = os.path.join(datafile, 'harv', 'lidardata_overflights.csv')
-            outdir = os.path.join(datafile, 'harv', 'six_minute')
-
-            # LiDAR, Radar, and Bubbler data
-            print('Reading Overflight Data from:', args.harv)
-            # Call overflight averaging function
-            ovdata = overflight.ovavg(args.harv, 'harv', outdir, rawdir)
-            ovdata.to_csv(ov_outfile, na_rep='NaN')
-            print('Writing Overflight Data to:', ov_outfile)
-            print('-------------------------------------')
-        # Create harvest time series
-        plotfile_raw_lid = os.path.join(dir_ts, 'harv', 'TS_RawLiDAR.png')
-        plotfile_corr_lid = os.path.join(dir_ts, 'harv', 'TS_CorrLiDAR.png')
-        plotfile_raw_bub = os.path.join(dir_ts, 'harv', 'TS_RawBubbler.png')
-        plotfile_corr_bub = os.path.join(dir_ts, 'harv', 'TS_CorrBubbler.png')
-        plotfile_raw_rad = os.path.join(dir_ts, 'harv', 'TS_RawRadar.png')
-        plotfile_corr_rad = os.path.join(dir_ts, 'harv', 'TS_CorrRadar.png')
-        plotfile_avg_raw = os.path.join(dir_ts, 'harv', 'TS_RawAverage.png')
-        plotfile_avg_corr = os.path.join(dir_ts, 'harv', 'TS_CorrAverage.png')
-        time, lid, rpw, rad, bub, ssh, benchmark, backscatter, swh, wind = \
-            loading.load_harv(f_lid_harv, args.harv, f_wind, args.lidarindex)
-        harv_ts.raw_lidar(ssh, benchmark, lid, time, plotfile_raw_lid)
-        harv_ts.corr_lidar(ssh, benchmark, lid, rpw, wind, time, plotfile_corr_lid)
-        harv_ts.raw_bubbler(ssh, benchmark, bub, time, plotfile_raw_bub)
-        harv_ts.corr_bubbler(ssh, benchmark, bub, time, swh, plotfile_corr_bub)
-        harv_ts.raw_radar(ssh, benchmark, rad, time, plotfile_raw_rad)
-        harv_ts.corr_radar(ssh, benchmark, rad, swh, wind, time, plotfile_corr_rad)
-        harv_ts.avg_raw(ssh, benchmark, rad, bub, time, plotfile_avg_raw)
-        harv_ts.avg_corr(ssh, benchmark, rad, bub, swh, wind, time, plotfile_avg_corr)
-
-    if args.cata is not None:
+def pipeline_tasks(args, indices, ind_lid):
+    """ Function to build the task graph of all runs. The overflights of all missions at a site are averaged in one
+    task sharing the raw LiDAR cache, inputs shared by the runs of a site (the Harvest wind file) are loaded once,
+    and the statistics and plots of each run only wait for its own inputs. """
+    from . import pipeline, loading
+    runs = site_runs(args)
+    site_names = sorted(set(site for site, _, _ in runs))
+    # The worker processes of the tasks are split between the sites, which run at the same time (see process)
+    jobs = max(1, args.jobs // len(site_names))
+
+    tasks = [pipeline.Task(name, func, fargs) for name, (func, fargs) in
+             [('wind', (loading.load_wind, (os.path.join('/', 'srv', 'data', 'harvest', 'harv', 'co-ops',
+                                                          'wind.txt'),)))]
+             if any(name in sites[site]['shared'] for site in site_names)]
+    for site in site_names:
         if args.load is not None:
-            rawdir = os.path.join(datafile, 'cata', 'uls')
-            ov_outfile = os.path.join(datafile, 'cata', 'lidardata_overflights.csv')
-            outdir = os.path.join(datafile, 'cata', 'six_minute')
-
-            # LiDAR, Radar, and Bubbler data
-            print('Reading Overflight Data from:', args.cata)
-            # Call overflight averaging function
-            ovdata = overflight.ovavg(args.cata, 'cata', outdir, rawdir)
-            ovdata.to_csv(ov_outfile, na_rep='NaN')
-            print('Writing Overflight Data to:', ov_outfile)
-            print('-------------------------------------')
-        # Create Catalina Time Series
-        plotfile_lid = os.path.join(dir_ts, 'cata', 'TS_RawLiDAR_Catalina.png')
-        plotfile_acoust = os.path.join(dir_ts, 'cata', 'TS_RawAcoust_LA.png')
-        plotfile_avg = os.path.join(dir_ts, 'cata', 'TS_RawAvg_Catalina.png')
-        bs_max = 15
-        time, lid, rpw, ssh, acoust, corr, swh, backscatter = loading.load_cata(f_lid_cata, args.cata, args.lidarindex)
-        cata_ts.raw_lidar(ssh, lid, corr, backscatter, time, plotfile_lid, bs_max)
-        cata_ts.raw_acoust(ssh, corr, acoust, backscatter, time, plotfile_acoust, bs_max)
-        cata_ts.raw_avg(ssh, corr, lid, acoust, backscatter, time, plotfile_avg, bs_max)
+            missions = [(mission, f_sat) for s, mission, f_sat in runs if s == site]
+            tasks.append(pipeline.Task('load:' + site, load_overflights, (args, site, missions, jobs)))
+    for site, mission, f_sat in runs:
+        run = site + ':' + mission
+        dir_ts = site_paths(args, site, mission)['dir_ts']
+        os.makedirs(dir_ts, exist_ok=True)
+        tasks.append(pipeline.Task('inputs:' + run, sites[site]['read'], (args, mission, f_sat, ind_lid),
+                                   deps=sites[site]['shared'], after=['load:' + site] if args.load is not None else []))
+        tasks.append(pipeline.Task('stats:' + run, sites[site]['stats'], (args, indices, dir_ts, jobs),
+                                   deps=['inputs:' + run]))
+        if not args.no_plots:
+            tasks.append(pipeline.Task('plots:' + run, sites[site]['plots'], (args, indices, dir_ts, jobs),
+                                       deps=['inputs:' + run]))
+    return tasks
+
+
+def load_overflights(args, site, missions, jobs):
+    """ Task averaging the overflights of the missions at a site. The overflights of all missions are averaged
+    together, so the raw data of an overflight shared by missions is averaged once and the raw day files are decoded
+    once per worker. """
+    from . import overflight, profiling
+    db = None
+    if args.store is not None:
+        from . import store
+        db = store.Store(args.store)
+    paths = [site_paths(args, site, mission) for mission, _ in missions]
+    plans = []
+    for (mission, f_sat), p in zip(missions, paths):
+        # LiDAR, Radar, and Bubbler data
+        print('Reading Overflight Data from:', f_sat)
+        plans.append(overflight.ovplan(f_sat, site, p['outdir'], p['rawdir'], p['ov_outfile'], args.incremental, db,
+                                       mission))
+    # Call overflight averaging function
+    with profiling.stage('ovload', site=site, mission=','.join(mission for mission, _ in missions)):
+        todo = sorted(set(t for plan in plans for t in plan['todo']))
+        data_ov = overflight.ovavg_times(todo, site, paths[0]['outdir'], paths[0]['rawdir'], jobs, args.cache_mb,
+                                         args.window_mb)
+        for plan in plans:
+            overflight.ovsave(plan, data_ov, db)
+    for plan in plans:
+        if db is None:
+            print('Writing Overflight Data to:', plan['ov_outfile'])
+    print('-------------------------------------')
+    if db is not None:
+        db.close()
+
+
+def overflight_source(args, site, mission):
+    """ Returns the overflight file of a run, or with --store the store holding its overflights and a view of them """
+    if args.store is None:
+        return None, site_paths(args, site, mission)['f_lid']
+    from . import store
+    db = store.Store(args.store)
+    return db, db.view(site, mission)
+
+
+def lidar_series(indices, lid):
+    """ Returns the (plot file suffix, lid) of every LiDAR index """
+    if len(indices) > 1:
+        return [('_' + index, l) for index, l in zip(indices, lid)]
+    return [('', lid)]
+
+
+########################## Harvest ###########################################################################
+def read_harv(wind, args, mission, f_sat, ind_lid):
+    """ Task reading the inputs of a Harvest run """
+    from . import loading, profiling
+    db, f_lid = overflight_source(args, 'harv', mission)
+    with profiling.stage('read_inputs', site='harv', mission=mission):
+        inputs = loading.load_harv(f_lid, f_sat, wind, ind_lid)
+    if db is not None:
+        db.close()
+    return inputs
+
+
+def stats_harv(inputs, args, indices, dir_ts, jobs):
+    """ Task computing the statistics of a Harvest run """
+    from . import bias, profiling
+    time, lid, rpw, rad, bub, ssh, benchmark, backscatter, swh, wind = inputs
+    with profiling.stage('stats', site='harv'):
+        if len(indices) > 1:
+            names, stats = bias.harv_index_stats(ssh, benchmark, lid, rpw, wind, time,
+                                                 bootstrap=bootstrap_options(args, jobs))
+            bias.write_index_stats(names, stats, indices, os.path.join(dir_ts, 'bias_stats_indices.csv'))
+        if args.no_plots and len(indices) == 1:
+            bias.write_stats(bias.harv_stats(ssh, benchmark, lid, rpw, rad, bub, swh, wind, time,
+                                             bootstrap=bootstrap_options(args, jobs)),
+                             os.path.join(dir_ts, 'bias_stats.json'), os.path.join(dir_ts, 'bias_series.csv'))
+
+
+def plots_harv(inputs, args, indices, dir_ts, jobs):
+    """ Task creating the plots of a Harvest run """
+    from . import harv_ts, render, profiling
+    time, lid, rpw, rad, bub, ssh, benchmark, backscatter, swh, wind = inputs
+    plotfile_raw_bub = os.path.join(dir_ts, 'TS_RawBubbler.png')
+    plotfile_corr_bub = os.path.join(dir_ts, 'TS_CorrBubbler.png')
+    plotfile_raw_rad = os.path.join(dir_ts, 'TS_RawRadar.png')
+    plotfile_corr_rad = os.path.join(dir_ts, 'TS_CorrRadar.png')
+    plotfile_avg_raw = os.path.join(dir_ts, 'TS_RawAverage.png')
+    plotfile_avg_corr = os.path.join(dir_ts, 'TS_CorrAverage.png')
+    options = plot_options(args)
+    tasks = []
+    for suffix, lid in lidar_series(indices, lid):
+        plotfile_raw_lid = os.path.join(dir_ts, 'TS_RawLiDAR' + suffix + '.png')
+        plotfile_corr_lid = os.path.join(dir_ts, 'TS_CorrLiDAR' + suffix + '.png')
+        tasks += [(harv_ts.raw_lidar, (ssh, benchmark, lid, time, plotfile_raw_lid), options),
+                  (harv_ts.corr_lidar, (ssh, benchmark, lid, rpw, wind, time, plotfile_corr_lid), options)]
+    tasks += [(harv_ts.raw_bubbler, (ssh, benchmark, bub, time, plotfile_raw_bub), options),
+              (harv_ts.corr_bubbler, (ssh, benchmark, bub, time, swh, plotfile_corr_bub), options),
+              (harv_ts.raw_radar, (ssh, benchmark, rad, time, plotfile_raw_rad), options),
+              (harv_ts.corr_radar, (ssh, benchmark, rad, swh, wind, time, plotfile_corr_rad), options),
+              (harv_ts.avg_raw, (ssh, benchmark, rad, bub, time, plotfile_avg_raw), options),
+              (harv_ts.avg_corr, (ssh, benchmark, rad, bub, swh, wind, time, plotfile_avg_corr), options)]
+    # Create the plots, in parallel with --jobs
+    with profiling.stage('render', site='harv'):
+        render.render(tasks, jobs)
+
+
+########################## Catalina ##########################################################################
+bs_max_cata = 15
+
+
+def read_cata(args, mission, f_sat, ind_lid):
+    """ Task reading the inputs of a Catalina run """
+    from . import loading, profiling
+    db, f_lid = overflight_source(args, 'cata', mission)
+    with profiling.stage('read_inputs', site='cata', mission=mission):
+        inputs = loading.load_cata(f_lid, f_sat, ind_lid)
+    if db is not None:
+        db.close()
+    return inputs
+
+
+def stats_cata(inputs, args, indices, dir_ts, jobs):
+    """ Task computing the statistics of a Catalina run """
+    from . import bias, profiling
+    time, lid, rpw, ssh, acoust, corr, swh, backscatter = inputs
+    with profiling.stage('stats', site='cata'):
+        if len(indices) > 1:
+            names, stats = bias.cata_index_stats(ssh, corr, lid, acoust, backscatter, time, bs_max_cata,
+                                                 bootstrap=bootstrap_options(args, jobs))
+            bias.write_index_stats(names, stats, indices, os.path.join(dir_ts, 'bias_stats_indices.csv'))
+        if args.no_plots and len(indices) == 1:
+            bias.write_stats(bias.cata_stats(ssh, corr, lid, acoust, backscatter, time, bs_max_cata,
+                                             bootstrap=bootstrap_options(args, jobs)),
+                             os.path.join(dir_ts, 'bias_stats.json'), os.path.join(dir_ts, 'bias_series.csv'))
+
+
+def plots_cata(inputs, args, indices, dir_ts, jobs):
+    """ Task creating the plots of a Catalina run """
+    from . import cata_ts, render, profiling
+    time, lid, rpw, ssh, acoust, corr, swh, backscatter = inputs
+    bs_max = bs_max_cata
+    plotfile_acoust = os.path.join(dir_ts, 'TS_RawAcoust_LA.png')
+    options = plot_options(args)
+    tasks = []
+    for suffix, lid in lidar_series(indices, lid):
+        plotfile_lid = os.path.join(dir_ts, 'TS_RawLiDAR_Catalina' + suffix + '.png')
+        plotfile_avg = os.path.join(dir_ts, 'TS_RawAvg_Catalina' + suffix + '.png')
+        tasks += [(cata_ts.raw_lidar, (ssh, lid, corr, backscatter, time, plotfile_lid, bs_max), options),
+                  (cata_ts.raw_avg, (ssh, corr, lid, acoust, backscatter, time, plotfile_avg, bs_max), options)]
+    tasks += [(cata_ts.raw_acoust, (ssh, corr, acoust, backscatter, time, plotfile_acoust, bs_max), options)]
+    # Create the plots, in parallel with --jobs
+    with profiling.stage('render', site='cata'):
+        render.render(tasks, jobs)
+
+
+# Stages of each site, and the shared inputs (tasks of pipeline_tasks) whose results its read stage takes first
+sites = {'harv': {'read': read_harv, 'stats': stats_harv, 'plots': plots_harv, 'shared': ['wind']},
+         'cata': {'read': read_cata, 'stats': stats_cata, 'plots': plots_cata, 'shared': []}}
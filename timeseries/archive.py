@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+############################################################################################################
+# Tools for maintaining the archive of raw LiDAR day files (uls_%Y%m%d.bin.gz/xz)
+############################################################################################################
+import os
+import datetime as dt
+import glob
+import gzip
+import lzma
+import argparse
+import numpy as np
+from . import loading
+
+
+index_dtype = np.dtype([(str('t_min'), np.uint32), (str('t_max'), np.uint32), (str('offset'), np.uint64),
+                        (str('length'), np.uint64), (str('n'), np.uint64)])
+
+
+########################## Block Index #######################################################################
+def index_file(f, block_seconds=600, force=False):
+    """ Function to write a copy of a raw LiDAR data file with one compressed member per block_seconds of data to
+    the blocks directory next to it, along with the block index sidecar of the copy (.idx) used by
+    loading.load_raw_window. The original file is not changed, and the index records its size and modification time
+    so a changed original is read whole until it is indexed again. Returns True if the file was indexed. """
+    if not force and loading.load_index(f) is not None:
+        return False
+    if f.endswith('.gz'):
+        opener, compress = gzip.open, gzip.compress
+    else:
+        opener, compress = lzma.open, lzma.compress
+    stat = os.stat(f)
+    with opener(f, 'rb') as nf:
+        try:
+            file_content = nf.read()
+        except EOFError:
+            print('File is still being transfered from LiDAR Station:', f)
+            return False
+    n = len(file_content) // 12
+    if n == 0:
+        return False
+    data = np.frombuffer(file_content, loading.raw_dtype, count=n)
+
+    # Start a new block whenever the time moves into a different block_seconds bin
+    bins = data['time'] // (block_seconds * 10000)
+    bounds = np.concatenate([[0], np.flatnonzero(bins[1:] != bins[:-1]) + 1, [n]])
+    blocks = np.zeros(len(bounds) - 1, dtype=index_dtype)
+    fblocks = loading.block_file(f)
+    os.makedirs(os.path.dirname(fblocks), exist_ok=True)
+    with open(fblocks + '.tmp', 'wb') as out:
+        for i in range(len(blocks)):
+            i1, i2 = bounds[i], bounds[i + 1]
+            end = i2 * 12 if i2 < n else len(file_content)  # A trailing partial record stays in the last block
+            member = compress(file_content[i1 * 12:end])
+            times = data['time'][i1:i2]
+            blocks[i] = (times.min(), times.max(), out.tell(), len(member), i2 - i1)
+            out.write(member)
+
+    # Make sure the copy holds the same data before using it
+    with opener(fblocks + '.tmp', 'rb') as nf:
+        if nf.read() != file_content:
+            os.remove(fblocks + '.tmp')
+            print('Blocked copy does not match, not indexed:', f)
+            return False
+    os.replace(fblocks + '.tmp', fblocks)
+    with open(fblocks + '.idx.tmp', 'wb') as fidx:
+        np.savez(fidx, blocks=blocks, filesize=stat.st_size, mtime=stat.st_mtime_ns)
+    os.replace(fblocks + '.idx.tmp', fblocks + '.idx')
+    print('Indexed', len(blocks), 'blocks of:', f)
+    return True
+
+
+def index_archive(rawdir, block_seconds=600, force=False):
+    """ Function to build the block index of every raw LiDAR data file in rawdir. """
+    files = sorted(glob.glob(os.path.join(rawdir, 'uls_*.bin.gz')) + glob.glob(os.path.join(rawdir, 'uls_*.bin.xz')))
+    count = 0
+    for f in files:
+        count += index_file(f, block_seconds, force)
+    print('Indexed', count, 'of', len(files), 'files in:', rawdir)
+
+
+########################## Memory Mapped Mirror #############################################################
+def mirror_file(f, force=False):
+    """ Function to write the time, range and rpw columns of a raw LiDAR data file as uncompressed, time sorted .npy
+    files in the npy directory next to it, which loading.load_raw opens as memory maps, with the size and modification
+    time of the file. Returns True if the file was mirrored. """
+    rawdir, name = os.path.split(f)
+    fnpy = os.path.join(rawdir, 'npy', name[:12])
+    if not force and loading.load_npy(dt.datetime.strptime(name[4:12], '%Y%m%d'), rawdir, f) is not None:
+        return False
+    opener = gzip.open if f.endswith('.gz') else lzma.open
+    stat = os.stat(f)
+    with opener(f, 'rb') as nf:
+        try:
+            file_content = nf.read()
+        except EOFError:
+            print('File is still being transfered from LiDAR Station:', f)
+            return False
+    data = np.frombuffer(file_content, loading.raw_dtype, count=len(file_content) // 12)
+    if np.any(data['time'][1:] < data['time'][:-1]):
+        data = data[np.argsort(data['time'], kind='stable')]
+
+    # The size and modification time of the day file are written last, so a mirror with them is complete
+    os.makedirs(os.path.join(rawdir, 'npy'), exist_ok=True)
+    for col in ('range', 'rpw', 'time'):
+        with open(fnpy + '.' + col + '.npy.tmp', 'wb') as fcol:
+            np.save(fcol, np.ascontiguousarray(data[col]))
+        os.replace(fnpy + '.' + col + '.npy.tmp', fnpy + '.' + col + '.npy')
+    with open(fnpy + '.src.npz.tmp', 'wb') as fsrc:
+        np.savez(fsrc, filesize=stat.st_size, mtime=stat.st_mtime_ns)
+    os.replace(fnpy + '.src.npz.tmp', fnpy + '.src.npz')
+    print('Mirrored', len(data), 'records of:', f)
+    return True
+
+
+def mirror_archive(rawdir, force=False):
+    """ Function to mirror every raw LiDAR data file in rawdir. """
+    files = sorted(glob.glob(os.path.join(rawdir, 'uls_*.bin.gz')) + glob.glob(os.path.join(rawdir, 'uls_*.bin.xz')))
+    count = 0
+    for f in files:
+        count += mirror_file(f, force)
+    print('Mirrored', count, 'of', len(files), 'files in:', rawdir)
+
+
+def main():
+    """ Main function for the raw LiDAR archive tools """
+    parser = argparse.ArgumentParser(description='Maintain the archive of raw LiDAR day files.')
+    subparsers = parser.add_subparsers(dest='command')
+    parser_index = subparsers.add_parser('index', help='Write indexed copies of the day files to RAWDIR/blocks so '
+                                                       'windows can be read without decompressing whole files.')
+    parser_index.add_argument('rawdir', nargs='+', help='Directory with uls_%%Y%%m%%d.bin.gz/xz files.')
+    parser_index.add_argument('--block-seconds', type=int, default=600,
+                              help='Seconds of data per compressed block. Default is 600.')
+    parser_index.add_argument('--force', action='store_true', help='Rebuild indexes that are up to date.')
+    parser_mirror = subparsers.add_parser('mirror', help='Write uncompressed, memory mappable .npy columns of each day '
+                                                         'file to RAWDIR/npy.')
+    parser_mirror.add_argument('rawdir', nargs='+', help='Directory with uls_%%Y%%m%%d.bin.gz/xz files.')
+    parser_mirror.add_argument('--force', action='store_true', help='Rewrite mirrors that are up to date.')
+    parser_sixmin = subparsers.add_parser('sixmin', help='Bin raw LiDAR day files into six minute statistics and '
+                                                         'merge them into the monthly six minute files.')
+    parser_sixmin.add_argument('rawdir', help='Directory with uls_%%Y%%m%%d.bin.gz/xz files.')
+    parser_sixmin.add_argument('outdir', help='Directory of the monthly {loc}_%%Y%%m.csv files.')
+    parser_sixmin.add_argument('--loc', choices=['harv', 'cata'], required=True, help='Site of the data.')
+    parser_sixmin.add_argument('--start', type=str, default=None, help='First day to bin (YYYY-MM-DD).')
+    parser_sixmin.add_argument('--end', type=str, default=None, help='Last day to bin (YYYY-MM-DD).')
+    parser_sixmin.add_argument('-j', '--jobs', type=int, default=1,
+                               help='Number of worker processes binning days. Default is 1.')
+
+    args = parser.parse_args()
+    if args.command == 'index':
+        for rawdir in args.rawdir:
+            index_archive(rawdir, args.block_seconds, args.force)
+    elif args.command == 'mirror':
+        for rawdir in args.rawdir:
+            mirror_archive(rawdir, args.force)
+    elif args.command == 'sixmin':
+        from . import sixmin
+        start, end = [None if d is None else dt.datetime.strptime(d, '%Y-%m-%d') for d in (args.start, args.end)]
+        sixmin.generate(sixmin.raw_days(args.rawdir, start, end), args.loc, args.rawdir, args.outdir, jobs=args.jobs)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+import json
+import numpy as np
+from . import reg, outliers
+from .bootstrap import intervals as bootstrap_intervals
+
+
+########################## Harvest Correction Models #########################################################
+# Each Harvest bias series in mm is a constant plus a linear combination of shared terms:
+#   d = ssh - benchmark, lid, rpw, rad, bub, swh, wind, swh2 = swh^2, swh_wind = swh*wind and
+#   swh_bub = swh with values below 0.5 m set to 0 (the SWH used in the averaged Bubbler correction).
+# Only nonzero terms are listed, so a series is missing (NaN) only where one of its own inputs is missing.
+def _model(const, **terms):
+    """ Function to build a correction model of a constant and term coefficients. """
+    return const, terms
+
+
+def _mean(*models):
+    """ Function to build the correction model of the average of models. """
+    const = sum(m[0] for m in models) / len(models)
+    terms = {}
+    for m in models:
+        for term, coef in m[1].items():
+            terms[term] = terms.get(term, 0) + coef / len(models)
+    return const, terms
+
+
+_raw_radar = _model(20150., d=1000., rad=-1000.)
+# '(1000*c2 + 0.5*c3 - 50*c4 + 9*c5 - 0.3*c6)/1000' - SWH, wind, SWH^2, wind*SWH
+_corr_radar = _model(20150., d=1000., rad=-1000., swh=0.0005, wind=-0.05, swh2=0.009, swh_wind=-0.0003)
+_raw_bubbler = _model(20150. - 50, d=1000., bub=-1000.)
+_corr_bubbler = _model(20150., d=1000., bub=-1000., swh=-31.)
+
+harv_models = {
+    'raw_lidar': _model(-6850. - 25, d=1000., lid=1000.),
+    # 'c2-.0054*c3+.0000087*c4' - Wind then received pulse width
+    'corr_lidar': _model(-6850. - 25 - 88.25, d=1000., lid=1000., wind=-5.4, rpw=.0087),
+    'raw_bubbler': _raw_bubbler,
+    'corr_bubbler': _corr_bubbler,
+    'raw_radar': _raw_radar,
+    'corr_radar': _corr_radar,
+    'avg_raw': _mean(_model(20150. - 50, d=1000., rad=-1000.), _model(20150., d=1000., bub=-1000.)),
+    'avg_corr': _mean(_corr_radar, _model(20150., d=1000., bub=-1000., swh_bub=-31.)),
+}
+
+
+def harv_terms(ssh, benchmark, lid=None, rpw=None, rad=None, bub=None, swh=None, wind=None):
+    """ Function to compute the shared terms of the Harvest correction models from the inputs which are given. """
+    terms = {'d': np.subtract(ssh, benchmark), 'lid': lid, 'rpw': rpw, 'rad': rad, 'bub': bub, 'swh': swh,
+             'wind': wind}
+    if swh is not None:
+        swh = np.asarray(swh, dtype=float)
+        terms['swh2'] = swh * swh
+        terms['swh_bub'] = np.where(swh < 0.5, 0, swh)
+        if wind is not None:
+            terms['swh_wind'] = swh * wind
+    return {k: np.asarray(v, dtype=float).ravel() for k, v in terms.items() if v is not None}
+
+
+def correct(models, terms, names=None):
+    """ Function to evaluate correction models in one pass over the shared terms. Returns the names of the
+    evaluated models and a 2-D array with one row per model. """
+    if names is None:
+        names = list(models)
+    n = len(terms['d'])
+    out = np.empty((len(names), n))
+    tmp = np.empty(n)
+    for i, name in enumerate(names):
+        const, coefs = models[name]
+        out[i] = const
+        for term, coef in coefs.items():
+            np.multiply(terms[term], coef, out=tmp)
+            out[i] += tmp
+    return names, out
+
+
+def harv_series(ssh, benchmark, lid, rpw, rad, bub, swh, wind):
+    """ Function to compute all Harvest bias series in mm. Returns the series names and a 2-D array with one row
+    per series. """
+    return correct(harv_models, harv_terms(ssh, benchmark, lid, rpw, rad, bub, swh, wind))
+
+
+def raw_lidar(ssh, benchmark, lid):
+    """ Raw LiDAR SSH bias in mm. """
+    return correct(harv_models, harv_terms(ssh, benchmark, lid=lid), ['raw_lidar'])[1][0]
+
+
+def corr_lidar(ssh, benchmark, lid, rpw, wind):
+    """ LiDAR SSH bias in mm corrected for wind and received pulse width. """
+    return correct(harv_models, harv_terms(ssh, benchmark, lid=lid, rpw=rpw, wind=wind), ['corr_lidar'])[1][0]
+
+
+def raw_bubbler(ssh, benchmark, bub):
+    """ Raw Bubbler SSH bias in mm. """
+    return correct(harv_models, harv_terms(ssh, benchmark, bub=bub), ['raw_bubbler'])[1][0]
+
+
+def corr_bubbler(ssh, benchmark, bub, swh):
+    """ Bubbler SSH bias in mm corrected for significant wave height. """
+    return correct(harv_models, harv_terms(ssh, benchmark, bub=bub, swh=swh), ['corr_bubbler'])[1][0]
+
+
+def raw_radar(ssh, benchmark, rad):
+    """ Raw Radar SSH bias in mm. """
+    return correct(harv_models, harv_terms(ssh, benchmark, rad=rad), ['raw_radar'])[1][0]
+
+
+def corr_radar(ssh, benchmark, rad, swh, wind):
+    """ Radar SSH bias in mm corrected for significant wave height and wind. """
+    return correct(harv_models, harv_terms(ssh, benchmark, rad=rad, swh=swh, wind=wind), ['corr_radar'])[1][0]
+
+
+def avg_raw(ssh, benchmark, rad, bub):
+    """ Average of the raw Radar and Bubbler SSH biases in mm. """
+    return correct(harv_models, harv_terms(ssh, benchmark, rad=rad, bub=bub), ['avg_raw'])[1][0]
+
+
+def avg_corr(ssh, benchmark, rad, bub, swh, wind):
+    """ Average of the corrected Radar and Bubbler SSH biases in mm. The Bubbler correction ignores SWH below 0.5 m.
+    """
+    return correct(harv_models, harv_terms(ssh, benchmark, rad=rad, bub=bub, swh=swh, wind=wind), ['avg_corr'])[1][0]
+
+
+def harv_stats(ssh, benchmark, lid, rpw, rad, bub, swh, wind, time, **clipping):
+    """ Function to compute the summaries of all Harvest bias time series. clipping is passed to summarize. """
+    names, series = harv_series(ssh, benchmark, lid, rpw, rad, bub, swh, wind)
+    return {name: summarize(data, time, **clipping)
+            for name, data in zip(names, series)}
+
+
+########################## Catalina Bias Series ##############################################################
+def cata_raw_lidar(ssh, lid, corr):
+    """ Raw LiDAR SSH bias at Catalina in mm. """
+    return np.add(np.subtract(ssh, corr), lid * 1000)
+
+
+def cata_raw_acoust(ssh, corr, acoust):
+    """ Raw LA acoustic tide gauge SSH bias in mm. """
+    return np.subtract(np.subtract(ssh, corr), acoust * 1000)
+
+
+def cata_raw_avg(ssh, corr, lid, acoust):
+    """ SSH bias in mm of the average of the Catalina LiDAR and LA acoustic tide gauge. """
+    avg = np.subtract(lid * 1000, acoust * 1000) / 2
+    return np.add(np.subtract(ssh, corr), avg)
+
+
+def cata_stats(ssh, corr, lid, acoust, backscatter, time, bs_max, **clipping):
+    """ Function to compute the summaries of all Catalina bias time series. clipping is passed to summarize. """
+    series = {'raw_lidar': cata_raw_lidar(ssh, lid, corr),
+              'raw_acoust': cata_raw_acoust(ssh, corr, acoust),
+              'raw_avg': cata_raw_avg(ssh, corr, lid, acoust)}
+    return {name: summarize(data, time, backscatter, bs_max, demean=True, **clipping)
+            for name, data in series.items()}
+
+
+########################## LiDAR Index Comparison ############################################################
+def harv_index_stats(ssh, benchmark, lids, rpw, wind, time, **clipping):
+    """ Function to compute the statistics of the Harvest LiDAR bias series for every LiDAR index, one row of lids
+    per index. Returns the series names and the statistics from stats_rows with shape (series, index). """
+    names = ['raw_lidar', 'corr_lidar']
+    terms = harv_terms(ssh, benchmark, rpw=rpw, wind=wind)
+    series = np.empty((len(names), len(lids), len(terms['d'])))
+    for i, lid in enumerate(lids):
+        terms['lid'] = np.asarray(lid, dtype=float).ravel()
+        series[:, i] = correct(harv_models, terms, names)[1]
+    return names, stats_rows(series, time, **clipping)
+
+
+def cata_index_stats(ssh, corr, lids, acoust, backscatter, time, bs_max, **clipping):
+    """ Function to compute the statistics of the Catalina bias series using LiDAR for every LiDAR index, one row of
+    lids per index. Returns the series names and the statistics from stats_rows with shape (series, index). """
+    names = ['raw_lidar', 'raw_avg']
+    lids = np.asarray(lids, dtype=float)
+    series = np.stack([cata_raw_lidar(ssh, lids, corr), cata_raw_avg(ssh, corr, lids, acoust)])
+    # As in summarize, remove the mean of each series before dropping passes with high backscatter
+    series = series - np.nanmean(series, axis=-1, keepdims=True)
+    series[..., ~(np.asarray(backscatter) < bs_max)] = np.nan
+    return names, stats_rows(series, time, **clipping)
+
+
+def stats_rows(series, time, nsigma=3., iterations=1, method='std', bootstrap=None):
+    """ Function to compute the statistics of many bias series at the same pass times at once, along the last axis
+    of series with NaN for passes which are not used. Returns a dictionary of arrays of the leading shape of series
+    with the numbers of included passes and outliers, the standard deviation of the included passes and the trend
+    fit. If bootstrap is a dictionary of bootstrap.intervals options, b1_lo, b1_hi and b1_se are added as in
+    summarize. """
+    series = np.asarray(series, dtype=float)
+    shape = series.shape[:-1]
+    rows = series.reshape(-1, series.shape[-1])
+    included, outlier = outliers.clip(rows, nsigma, iterations, method)
+    std = outliers.moments(rows, included)[1][:, 0]
+    xnum = years(time)
+    b0, b1, r2 = reg.linreg_rows(xnum, rows, included)
+    stats = {'n_included': included.sum(axis=-1).reshape(shape), 'n_outliers': outlier.sum(axis=-1).reshape(shape),
+             'std': std.reshape(shape), 'r2': r2.reshape(shape), 'b0': b0.reshape(shape), 'b1': b1.reshape(shape)}
+    if bootstrap is not None:
+        # Each row is resampled as summarize resamples a single series, so the intervals are the same
+        bounds = np.array([bootstrap_intervals({'b1': (xnum[row], data[row])}, **bootstrap)['b1']
+                           for data, row in zip(rows, included.astype(bool))])
+        for key, values in zip(('b1_lo', 'b1_hi', 'b1_se'), bounds.T):
+            stats[key] = values.reshape(shape)
+    return stats
+
+
+def write_index_stats(names, stats, indices, fstats):
+    """ Function to print the statistics of the bias series for every LiDAR index side by side and write them to a
+    CSV file. """
+    header = ['series', 'statistic'] + list(indices)
+    rows = [(name, key, stats[key][i]) for i, name in enumerate(names)
+            for key in ('n_included', 'n_outliers', 'std', 'r2', 'b0', 'b1', 'b1_lo', 'b1_hi', 'b1_se') if key in stats]
+    lines = [header] + [[name, key] + [('%d' if key.startswith('n_') else '%.6g') % v for v in values]
+                        for name, key, values in rows]
+    widths = [max(len(line[j]) for line in lines) for j in range(len(header))]
+    for line in lines:
+        print('  '.join(v.ljust(w) if j < 2 else v.rjust(w) for j, (v, w) in enumerate(zip(line, widths))))
+    with open(fstats, 'w') as f:
+        f.write(','.join(header) + '\n')
+        for name, key, values in rows:
+            values = [str(int(v)) if key.startswith('n_') else repr(float(v)) for v in values]
+            f.write(','.join([name, key] + values) + '\n')
+    print('LiDAR index comparison saved to:', fstats)
+
+
+########################## Summary Statistics ################################################################
+def summarize(data, time, backscatter=None, bs_max=None, demean=False, nsigma=3., iterations=1, method='std',
+              bootstrap=None):
+    """ Function to remove missing passes from a bias time series, optionally remove the mean and passes with
+    backscatter of bs_max or more, split outliers with outliers.clip and fit a linear trend in mm/yr to the included
+    passes. If bootstrap is a dictionary of bootstrap.intervals options, the bootstrap confidence interval and
+    standard error of the slope are added as b1_lo, b1_hi and b1_se. Returns a dictionary with the remaining time and
+    data, the indices of included and outlier passes, the standard deviation of the included passes and the trend
+    fit. """
+    time = np.asarray(time)
+    indnan = np.invert(np.isnan(data))
+    data = data[indnan]
+    time = time[indnan]
+    if demean:
+        data = data - np.mean(data)
+    if backscatter is not None:
+        ind_lowbs = np.asarray(backscatter)[indnan] < bs_max
+        data = data[ind_lowbs]
+        time = time[ind_lowbs]
+
+    # Find Outliers
+    included, outlier = outliers.clip(data, nsigma, iterations, method)
+    not_ind = np.flatnonzero(included)
+    out_ind = np.flatnonzero(outlier)
+
+    # Fit data
+    xnum = years(time)
+    if len(not_ind) > 1:
+        yfit, b0, b1, r2 = reg.linreg_ts(xnum[not_ind], data[not_ind])
+    else:
+        yfit, b0, b1, r2 = np.full(len(not_ind), np.nan), np.nan, np.nan, np.nan
+    s = {'time': time, 'data': data, 'not_ind': not_ind, 'out_ind': out_ind, 'std': np.std(data[not_ind]),
+         'yfit': yfit, 'b0': b0, 'b1': b1, 'r2': r2}
+    if bootstrap is not None:
+        s['b1_lo'], s['b1_hi'], s['b1_se'] = \
+            bootstrap_intervals({'b1': (xnum[not_ind], data[not_ind])}, **bootstrap)['b1']
+    return s
+
+
+def years(time):
+    """ Function to convert pass times to years of 365 days since 2016-01-01 for the trend fits. """
+    xnum = (np.asarray(time, dtype='datetime64[us]') - np.datetime64('2016-01-01')) / np.timedelta64(1, 's')
+    return xnum / (3600 * 24 * 365)
+
+
+def write_stats(summaries, fstats, fseries):
+    """ Function to write the statistics of bias time series summaries to a JSON file and the bias of every pass to
+    a CSV file. """
+    stats = {}
+    for name, s in summaries.items():
+        stats[name] = {'n_included': len(s['not_ind']), 'n_outliers': len(s['out_ind'])}
+        for key in ('std', 'r2', 'b0', 'b1', 'b1_lo', 'b1_hi', 'b1_se'):
+            if key in s:
+                stats[name][key] = float(s[key]) if np.isfinite(s[key]) else None
+    with open(fstats, 'w') as f:
+        json.dump(stats, f, indent=2)
+    print('Bias statistics saved to:', fstats)
+
+    with open(fseries, 'w') as f:
+        f.write('series,time,bias,included,outlier\n')
+        for name, s in summaries.items():
+            included = np.zeros(len(s['data']), dtype=int)
+            outlier = np.zeros(len(s['data']), dtype=int)
+            included[s['not_ind']] = 1
+            outlier[s['out_ind']] = 1
+            times = np.datetime_as_string(np.asarray(s['time'], dtype='datetime64[us]'))
+            for t, b, i, o in zip(times, s['data'], included, outlier):
+                f.write('%s,%s,%r,%d,%d\n' % (name, t.replace('T', ' '), float(b), i, o))
+    print('Bias time series saved to:', fseries)
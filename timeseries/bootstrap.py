@@ -0,0 +1,78 @@
+import zlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+
+chunk_size = 256  # Replicates resampled and solved together, which bounds the memory of a chunk to 2 arrays of
+                  # chunk_size x passes floats
+
+
+########################## Resampling ########################################################################
+def resample(n, replicates, block=1, rng=None):
+    """ Function to draw the indices of replicates bootstrap samples of n points as a (replicates, n) array. With
+    block > 1 the samples are made of moving blocks of block consecutive points, which keeps the correlation of
+    neighbouring passes of a time sorted series. """
+    rng = np.random.default_rng(rng)
+    block = max(1, min(int(block), n))
+    if block == 1:
+        return rng.integers(0, n, size=(replicates, n))
+    nblocks = -(-n // block)
+    starts = rng.integers(0, n - block + 1, size=(replicates, nblocks))
+    return (starts[:, :, None] + np.arange(block)).reshape(replicates, nblocks * block)[:, :n]
+
+
+def slopes(x, y, idx):
+    """ Function to solve the least squares line of every bootstrap sample at once. idx is a (replicates, n) array of
+    indices into x and y. Returns the slope of every sample, NaN for samples where all x are the same. """
+    xs = x[idx]
+    xs -= xs.mean(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.einsum('ij,ij->i', xs, y[idx]) / np.einsum('ij,ij->i', xs, xs)
+
+
+def _slopes_chunk(x, y, replicates, block, seed):
+    """ Worker function for intervals which resamples and solves one chunk of replicates. """
+    return slopes(x, y, resample(len(x), replicates, block, np.random.default_rng(seed)))
+
+
+########################## Confidence Intervals ##############################################################
+def intervals(series, replicates=2000, block=1, level=0.95, seed=0, jobs=1):
+    """ Function to compute bootstrap confidence intervals of the trend slope of every series, given as a dictionary
+    of (x, y) points. The replicates of each series are split into chunks with their own random streams spawned from
+    seed and the name of the series, so the result does not depend on jobs or on which other series are computed.
+    With jobs > 1 the chunks of all series are solved in a pool of worker processes. Returns a dictionary of the
+    lower and upper bounds and the standard error of the slope of every series, NaN with fewer than three points. """
+    tasks = []
+    for name, (x, y) in series.items():
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        if len(x) < 3:
+            continue
+        sizes = [chunk_size] * (replicates // chunk_size)
+        if replicates % chunk_size:
+            sizes.append(replicates % chunk_size)
+        seeds = np.random.SeedSequence([seed, zlib.crc32(name.encode())]).spawn(len(sizes))
+        tasks += [(name, x, y, size, block, s) for size, s in zip(sizes, seeds)]
+
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            results = list(pool.map(_slopes_chunk, *zip(*[task[1:] for task in tasks])))
+    else:
+        results = [_slopes_chunk(*task[1:]) for task in tasks]
+
+    samples = {}
+    for task, result in zip(tasks, results):
+        samples.setdefault(task[0], []).append(result)
+    tail = 50. * (1. - level)
+    bounds = {}
+    for name in series:
+        if name not in samples:
+            bounds[name] = (np.nan, np.nan, np.nan)
+            continue
+        b_1 = np.concatenate(samples[name])
+        b_1 = b_1[np.isfinite(b_1)]
+        if len(b_1) < 2:
+            bounds[name] = (np.nan, np.nan, np.nan)
+            continue
+        lo, hi = np.percentile(b_1, [tail, 100. - tail])
+        bounds[name] = (float(lo), float(hi), float(np.std(b_1, ddof=1)))
+    return bounds
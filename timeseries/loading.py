@@ -1,224 +1,418 @@
 import datetime as dt
 import numpy as np
 import sys
-from . import reg
+from . import reg, profiling
 import os
 import lzma
+import zlib
 import gzip
 import pandas as pd
-import dateutil.parser as parser
+from collections import OrderedDict
+from functools import partial
 
 
 ########################## Load Data #######################################################################
-def load_cata(f_lid, f_sat, ind_lid):
-    # Load LiDAR Data
-    time = []
-    lid = []
-    rpw = []
-    acoust = []
-    i = 0
-    with open(f_lid, 'r') as lidarfile:
-        for line in lidarfile:
-            data = [x.strip() for x in line.split(',')]
-            if i== 0:
-                indTime = data.index("time")
-                indLid = data.index(ind_lid)
-                indRpw = data.index("l_rpw")
-                indAcoust = data.index("acoust")
-            else:
-                time.append(dt.datetime.strptime(data[indTime], "%Y-%m-%d %H:%M:%S.%f"))
-                lid.append(float(data[indLid]))
-                rpw.append(float(data[indRpw]))
-                acoust.append(float(data[indAcoust]))
-            i = i + 1
+# Overflight file columns of the LiDAR indices which are named differently
+lidar_columns = {'l_lin1100': 'l_lin1100s'}
+
 
+def load_cata(f_lid, f_sat, ind_lid):
     # Load Satellite Data
-    tJ2000 = dt.datetime(2000, 1, 1, 12)
-    time2 = []
-    ssh = []
-    corr = []
-    swh = []
-    backscatter = []
-    with open(f_sat, 'r') as satfile:
-        for line in satfile:
-            data = [x.strip() for x in line.split()]
-            try:
-                time2.append(tJ2000 + dt.timedelta(seconds=float(data[0])))
-                ssh.append(float(data[1]))
-                corr.append(float(data[2]))
-                swh.append(float(data[3]))
-                backscatter.append(float(data[4]))
-            except ValueError:
-                time2.append(parser.parse(data[0] + " " + data[1]))
-                ssh.append(float(data[2]))
-                corr.append(float(data[3]))
-                swh.append(float(data[4]))
-                backscatter.append(float(data[5]))
+    time2, (ssh, corr, swh, backscatter) = read_satellite(f_sat)
+
+    # Load LiDAR Data, one row of lid per index when ind_lid is a list
+    time, lid, (rpw, acoust) = read_lidar(f_lid, ind_lid, ['l_rpw', 'acoust'], time2)
 
     # Ensure dates are the same
-    try:
-        assert time == time2
-    except:
+    if not np.array_equal(time, time2):
         print("Different Overflight Times. Something is wrong.")
         sys.exit(0)
 
-    # Convert to numpy arrays
-    time = np.asarray(time)
-    lid = np.asarray(lid)
-    rpw = np.asarray(rpw)
-    ssh = np.asarray(ssh)
-    acoust = np.asarray(acoust)
-    swh = np.array(swh)
-    backscatter = np.array(backscatter)
-
     # Return Data
+    time = time.astype(object)
     print("Data loaded successfully.")
     return time, lid, rpw, ssh, acoust, corr, swh, backscatter
 
 
 ########################## Load Data #######################################################################
 def load_harv(f_lid, f_sat, f_wind, ind_lid):
-    # Load LiDAR Data
-    time = []
-    lid = []
-    bub = []
-    rad = []
-    rpw = []
-    i = 0
-    with open(f_lid, 'r') as lidarfile:
-        for line in lidarfile:
-            data = [x.strip() for x in line.split(',')]
-            if i == 0:
-                indTime = data.index("time")
-                indLid = data.index(ind_lid)
-                indRpw = data.index("l_rpw")
-                indBub = data.index("bub")
-                indRad = data.index("rad")
-            else:
-                time.append(dt.datetime.strptime(data[indTime], "%Y-%m-%d %H:%M:%S.%f"))
-                lid.append(float(data[indLid]))
-                rpw.append(float(data[indRpw]))
-                bub.append(float(data[indBub]))
-                rad.append(float(data[indRad]))
-            i = i + 1
-
     # Load Satellite Data
-    tJ2000 = dt.datetime(2000, 1, 1, 12)
-    time2 = []
-    ssh = []
-    benchmark = []
-    backscatter = []
-    swh = []
-    with open(f_sat, 'r') as satfile:
-        for line in satfile:
-            data = [x.strip() for x in line.split()]
-            try:
-                time2.append(tJ2000 + dt.timedelta(seconds=float(data[0])))
-                ssh.append(float(data[1]))
-                benchmark.append(float(data[2]))
-                backscatter.append(float(data[3]))
-                swh.append(float(data[4]))
-            except ValueError:
-                time2.append(parser.parse(data[0] + " " + data[1]))
-                ssh.append(float(data[2]))
-                benchmark.append(float(data[3]))
-                backscatter.append(float(data[4]))
-                swh.append(float(data[5]))
+    time2, (ssh, benchmark, backscatter, swh) = read_satellite(f_sat)
+
+    # Load LiDAR Data, one row of lid per index when ind_lid is a list
+    time, lid, (rpw, bub, rad) = read_lidar(f_lid, ind_lid, ['l_rpw', 'bub', 'rad'], time2)
 
     # Ensure dates are the same
-    try:
-        assert (time == time2)
-    except:
+    if not np.array_equal(time, time2):
         print("Different Overflight Times. Something is wrong.")
         sys.exit(0)
 
-    # Load Wind Data
-    # YY  MM DD hh mm WDIR WSPD GDR GST GTIME
-    # yr  mo dy hr mn degT m/s degT m/s hhmm
-    wspd = []
-    time3 = []
-    with open(f_wind, 'r') as windfile:
-        for line in windfile:
-            data = [x.strip() for x in line.split()]
-            time3.append(dt.datetime(int(data[0]), int(data[1]), int(data[2]), int(data[3]), int(data[4])))
-            wspd.append(float(data[6]))
-
-    wind = []
-    for t in time:
-        t1 = t - dt.timedelta(hours=2)
-        t2 = t + dt.timedelta(hours=2)
-        try:
-            time_, wind_ = zip(*((i, j) for i, j in zip(time3, wspd) if i >= t1 and i <= t2))
-        except ValueError:
-            time_, wind_ = [], []
-        wind.append(reg.quadreg_ts(time_, wind_, t))
-
-    # Convert to numpy arrays
-    time = np.asarray(time)
-    lid = np.asarray(lid)
-    rpw = np.asarray(rpw)
-    bub = np.asarray(bub)
-    rad = np.asarray(rad)
-    ssh = np.asarray(ssh)
-    benchmark = np.asarray(benchmark)
-    backscatter = np.asarray(backscatter)
-    swh = np.asarray(swh)
-    wind = np.asarray(wind)
+    # Load Wind Data, unless it was loaded already
+    time3, wspd = load_wind(f_wind) if isinstance(f_wind, str) else f_wind
+    wind = wind_fit(time, time3, wspd)
 
     # Return Data
+    time = time.astype(object)
     print("Data loaded successfully.")
     return time, lid, rpw, rad, bub, ssh, benchmark, backscatter, swh, wind
 
+
+def read_overflights(f_lid, columns, times=None):
+    """ Function to read the overflight file written when loading, or the overflights at times from a store.View
+    given as f_lid. Returns the times as a datetime64 array and the requested columns as rows of a float array. """
+    if not isinstance(f_lid, str):
+        return f_lid.read(columns, times)
+    data = pd.read_csv(f_lid, skipinitialspace=True)
+    profiling.count(bytes_read=os.path.getsize(f_lid), rows=len(data))
+    data.columns = [col.strip() for col in data.columns]
+    time = pd.to_datetime(data['time'], format='ISO8601').to_numpy(dtype='datetime64[us]')
+    return time, data[columns].to_numpy(dtype=float).T
+
+
+def read_lidar(f_lid, ind_lid, columns, times=None):
+    """ Function to read the LiDAR index ind_lid, or a list of indices, and other columns from the overflight file
+    (or store, see read_overflights). Returns the times, lid (1-D for a single index, otherwise with one row per
+    index) and the rows of the other columns. """
+    indices = [ind_lid] if isinstance(ind_lid, str) else list(ind_lid)
+    time, data = read_overflights(f_lid, [lidar_columns.get(i, i) for i in indices] + columns, times)
+    lid = data[0] if isinstance(ind_lid, str) else data[:len(indices)]
+    return time, lid, data[len(indices):]
+
+
+def read_satellite(f_sat):
+    """ Function to read a satellite data file. Whether the first column is seconds since J2000 or a date followed by
+    a time is detected once from the first line, and the whole column is then converted at once. Returns the times
+    as a datetime64 array and the four value columns after it as rows of a float array. Any further columns are
+    ignored. """
+    with open(f_sat, 'r') as satfile:
+        first = satfile.readline().split()
+    try:
+        float(first[0])
+        j2000 = True
+    except ValueError:
+        j2000 = False
+
+    if j2000:
+        data = pd.read_csv(f_sat, sep=r'\s+', header=None, usecols=range(5)).to_numpy(dtype=float)
+        profiling.count(bytes_read=os.path.getsize(f_sat), rows=len(data))
+        # Whole seconds and rounded microseconds, as dt.timedelta(seconds=...) does
+        secs = np.floor(data[:, 0])
+        usecs = np.round((data[:, 0] - secs) * 1e6)
+        time = (np.datetime64('2000-01-01T12:00:00', 'us') + secs.astype(np.int64) * np.timedelta64(1, 's') +
+                usecs.astype(np.int64) * np.timedelta64(1, 'us'))
+        return time, data[:, 1:].T
+    data = pd.read_csv(f_sat, sep=r'\s+', header=None, usecols=range(6), dtype={0: str, 1: str})
+    profiling.count(bytes_read=os.path.getsize(f_sat), rows=len(data))
+    datestr = data[0] + ' ' + data[1]
+    try:
+        time = pd.to_datetime(datestr).to_numpy(dtype='datetime64[us]')
+    except (TypeError, ValueError):
+        import dateutil.parser as parser
+        time = np.array([parser.parse(d) for d in datestr], dtype='datetime64[us]')
+    return time, data.iloc[:, 2:].to_numpy(dtype=float).T
+
+
+def load_wind(f_wind):
+    """ Function to load the CO-OPS wind file. Returns the times as a sorted datetime64 array and the wind speeds. """
+    data = load_cached(f_wind, _parse_wind)
+    return data.index.values, data['wspd'].to_numpy()
+
+
+def _parse_wind(f_wind):
+    """ Function to parse the CO-OPS wind file into a time sorted dataframe. """
+    # YY  MM DD hh mm WDIR WSPD GDR GST GTIME
+    # yr  mo dy hr mn degT m/s degT m/s hhmm
+    data = pd.read_csv(f_wind, sep=r'\s+', header=None, usecols=[0, 1, 2, 3, 4, 6], comment='#',
+                       names=['year', 'month', 'day', 'hour', 'minute', 'wspd'])
+    time = pd.to_datetime(data[['year', 'month', 'day', 'hour', 'minute']])
+    data = pd.DataFrame({'wspd': data['wspd'].to_numpy(dtype=float)}, index=pd.DatetimeIndex(time, name='time'))
+    return data.sort_index(kind='stable')
+
+
+def wind_fit(time, time3, wspd):
+    """ Function to find the wind speed at each overflight time with a quadratic regression on the wind data within
+    2 hours. The windows are found with binary searches in the sorted wind times and fit in one batched call. """
+    timedelta_2h = np.timedelta64(2, 'h')
+    i1 = np.searchsorted(time3, time - timedelta_2h, 'left')
+    i2 = np.searchsorted(time3, time + timedelta_2h, 'right')
+    n = i2 - i1
+    offsets = np.concatenate([[0], np.cumsum(n)])
+    ind = np.arange(offsets[-1]) - np.repeat(offsets[:-1] - i1, n)
+    xnum = (time3[ind] - np.repeat(time, n)) / np.timedelta64(1, 's')
+    ynum = wspd[ind]
+    wind = reg.polyfit_windows(xnum, ynum, offsets, 2)[:, 0]
+    # No wind data gives 0 like reg.quadreg_ts, and windows too short for the batched fit use np.polyfit
+    wind[n == 0] = 0
+    for k in np.flatnonzero((n > 0) & (n <= 2)):
+        wind[k] = np.polyfit(xnum[offsets[k]:offsets[k + 1]], ynum[offsets[k]:offsets[k + 1]], 2)[-1]
+    return wind
+
+
 ########## Load Raw Data #######################################################################################
-def load_raw(d, rawdir):
-    """ Function to determine filetype and load raw LiDAR data. """
+# Record of the raw LiDAR data files: time in 1e-4 s, range in mm and return power
+raw_dtype = np.dtype([(str('time'), np.uint32), (str('range'), np.uint32), (str('rpw'), np.uint32)])
+
+
+def load_raw(d, rawdir, cache=None, frame=True):
+    """ Function to determine filetype and load raw LiDAR data. With frame=False the records are returned as a
+    dictionary of time sorted time, range and rpw columns instead of a dataframe. If a RawCache is given the day is
+    loaded through it, so the returned columns must not be modified. """
+    if cache is not None:
+        data = cache.load(d, rawdir)
+    else:
+        f = raw_file(d, rawdir)
+        data = load_npy(d, rawdir, f)
+        if data is not None:
+            print('LiDAR Data loaded from:', d.strftime('npy/uls_%Y%m%d'))
+        elif f is None:
+            return None
+        elif f.endswith('.gz'):
+            data = raw_columns(load_gzbin(f, raw_dtype, frame=False))
+        else:
+            data = raw_columns(load_xzbin(f, raw_dtype, frame=False))
+    if frame and data is not None:
+        return raw_frame(data)
+    return data
+
+
+def raw_file(d, rawdir):
+    """ Function to find the raw LiDAR data file of the day of d. Returns None if there is no file. """
     fgzbin = d.strftime(rawdir + '/uls_%Y%m%d.bin.gz')
     fxzbin = d.strftime(rawdir + '/uls_%Y%m%d.bin.xz')
-    dtype = np.dtype([(str('time'), np.uint32), (str('range'), np.uint32), (str('rpw'), np.uint32)])
     if os.path.isfile(fgzbin):
-        return load_gzbin(fgzbin, dtype)
+        return fgzbin
     elif os.path.isfile(fxzbin):
-        return load_xzbin(fxzbin, dtype)
+        return fxzbin
     else:
         return None
 
 
-def load_gzbin(f, dtype):
-    """ Function to load binary data file from LIDAR sensor using gz compression. """
+def load_raw_window(d, t1, t2, rawdir, cache=None, frame=True):
+    """ Function to load raw LiDAR data of the day of d between t1 and t2 seconds after midnight. A memory mapped
+    mirror of the day is sliced directly. If the day file has an up to date blocked copy only the blocks overlapping
+    the window are decompressed, otherwise the whole day is loaded (through cache if given). With frame=False the
+    window is returned as a dictionary of views of the time, range and rpw columns. """
+    f = raw_file(d, rawdir)
+    data = load_npy(d, rawdir, f)
+    if data is not None:
+        print('LiDAR Data loaded from:', d.strftime('npy/uls_%Y%m%d'))
+    elif f is None:
+        return None
+    else:
+        blocks = load_index(f)
+        if blocks is not None:
+                data = raw_columns(load_blocks(f, blocks, raw_dtype, t1, t2, frame=False))
+        else:
+            data = load_raw(d, rawdir, cache, frame=False)
+    mapped = isinstance(data['time'], np.memmap)
+    data = raw_window(data, t1, t2)
+    if mapped:  # Only the pages of the window are read from a mirror
+        profiling.count(bytes_read=12 * len(data['time']), rows=len(data['time']))
+    if frame:
+        return raw_frame(data)
+    return data
+
+
+def raw_window(data, t1, t2):
+    """ Function to cut the records between t1 and t2 seconds after midnight out of time sorted raw LiDAR columns
+    with binary searches. Returns a dictionary of views of the time, range and rpw columns. """
+    time = data['time']
+    # One tick of margin around the window, which is then trimmed with the float times used by raw_frame
+    bounds = np.clip([np.floor(t1 * 10000) - 1, np.ceil(t2 * 10000) + 1], 0, 2 ** 32 - 1).astype(np.uint32)
+    i1, i2 = np.searchsorted(time, bounds)
+    tsec = time[i1:i2] / 10000
+    i1, i2 = i1 + np.searchsorted(tsec, t1, 'left'), i1 + np.searchsorted(tsec, t2, 'right')
+    return {col: data[col][i1:i2] for col in ('time', 'range', 'rpw')}
+
+
+def raw_columns(data):
+    """ Function to split raw LiDAR records into contiguous, time sorted time, range and rpw columns. """
+    if data is None:
+        return None
+    if np.any(data['time'][1:] < data['time'][:-1]):
+        data = data[np.argsort(data['time'], kind='stable')]
+    return {col: np.ascontiguousarray(data[col]) for col in ('time', 'range', 'rpw')}
+
+
+def load_npy(d, rawdir, f=None):
+    """ Function to open the uncompressed, time sorted columns of a raw LiDAR day written by calval-archive mirror as
+    memory maps. Returns None if there is no complete mirror or if the day file f changed since it was mirrored. """
+    fnpy = d.strftime(os.path.join(rawdir, 'npy', 'uls_%Y%m%d'))
+    try:
+        with np.load(fnpy + '.src.npz') as src:
+            if f is not None:
+                stat = os.stat(f)
+                if int(src['filesize']) != stat.st_size or int(src['mtime']) != stat.st_mtime_ns:
+                    return None
+        return {col: np.load(fnpy + '.' + col + '.npy', mmap_mode='r') for col in ('time', 'range', 'rpw')}
+    except (IOError, OSError, KeyError, ValueError):
+        return None
+
+
+def block_file(f):
+    """ Function to name the copy of a raw LiDAR data file with one compressed block per interval of data written
+    by calval-archive index, in the blocks directory next to the file. """
+    return os.path.join(os.path.dirname(f), 'blocks', os.path.basename(f))
+
+
+def load_index(f):
+    """ Function to load the block index of the blocked copy of a raw LiDAR data file. Returns None if there is no
+    index or if the data file changed since the index was built. """
+    try:
+        with np.load(block_file(f) + '.idx') as idx:
+            stat = os.stat(f)
+            if int(idx['filesize']) != stat.st_size or int(idx['mtime']) != stat.st_mtime_ns:
+                return None
+            return idx['blocks']
+    except (IOError, OSError, KeyError, ValueError):
+        return None
+
+
+def load_blocks(f, blocks, dtype, t1, t2, frame=True):
+    """ Function to load the blocks of the blocked copy of an indexed raw LiDAR data file which overlap t1 to t2
+    seconds after midnight. Each block is a separate gz member or xz stream, so it is decompressed on its own. """
+    decompress = gzip.decompress if f.endswith('.gz') else lzma.decompress
+    sel = blocks[(blocks['t_max'] >= t1 * 10000) & (blocks['t_min'] <= t2 * 10000)]
+    with open(block_file(f), 'rb') as nf:
+        file_content = []
+        for block in sel:
+            nf.seek(int(block['offset']))
+            file_content.append(decompress(nf.read(int(block['length']))))
+    file_content = b''.join(file_content)
+    profiling.count(bytes_read=int(np.sum(sel['length'])), bytes_decompressed=len(file_content),
+                    rows=len(file_content) // 12)
+    data = np.frombuffer(file_content, dtype, count=len(file_content) // 12)
+    print('LiDAR Data loaded from:', f[-19:], '(' + str(len(sel)) + ' of ' + str(len(blocks)) + ' blocks)')
+    if frame:
+        return raw_frame(data)
+    return data
+
+
+def raw_frame(data):
+    """ Function to create a dataframe with time in seconds and range in meters from raw LiDAR records. """
+    data = {'time': data['time'].astype(float) / 10000, 'range': data['range'].astype(float) / 1000,
+            'rpw': data['rpw']}  # data organization
+    data = pd.DataFrame.from_dict(data)  # creates dataframe
+    data.set_index('time', inplace=True, drop=True)  # sets index as time
+    return data
+
+
+class RawCache(object):
+    """ Least recently used cache of decoded raw LiDAR day files keyed by (rawdir, date). The cache holds at most
+    max_mb megabytes of data and counts hits, misses and evictions. """
+    def __init__(self, max_mb=512):
+        self.max_bytes = int(max_mb * 1024 ** 2)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._days = OrderedDict()
+
+    def load(self, d, rawdir):
+        """ Returns the time sorted raw LiDAR columns for the day of d, decoding the day file only if it is not
+        cached. """
+        key = (rawdir, dt.date(d.year, d.month, d.day))
+        if key in self._days:
+            self.hits += 1
+            self._days.move_to_end(key)
+            return self._days[key][0]
+        self.misses += 1
+        data = load_raw(d, rawdir, frame=False)
+        # Memory maps of a mirror are not held in memory
+        size = 0 if data is None else sum(col.nbytes for col in data.values() if not isinstance(col, np.memmap))
+        if size <= self.max_bytes:
+            while self.nbytes + size > self.max_bytes:
+                _, (_, size_old) = self._days.popitem(last=False)
+                self.nbytes -= size_old
+                self.evictions += 1
+            self._days[key] = (data, size)
+            self.nbytes += size
+        return data
+
+    def stats(self):
+        """ Returns the cache counters as a dictionary. """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class WindowBuffer(object):
+    """ Preallocated time, range and rpw columns which raw LiDAR windows are written into, so a window running into
+    the next day is not concatenated from copies and the memory used for windows does not grow with the number of
+    overflights. The buffer holds at most max_mb megabytes, and its pages are only touched as windows fill them. A
+    window which does not fit gets columns of its own, which are freed once it is used. """
+    record_bytes = 20  # Float time and range and uint32 rpw of each record
+
+    def __init__(self, max_mb=64):
+        self.capacity = int(max_mb * 1024 ** 2) // self.record_bytes
+        self.oversize = 0
+        self._columns = None
+
+    def columns(self, n):
+        """ Returns time, range and rpw columns of n records, which are overwritten by the next call. """
+        if n > self.capacity:
+            self.oversize += 1
+            print('LiDAR window of', n, 'points does not fit the window buffer.')
+            return window_columns(n)
+        if self._columns is None:
+            self._columns = window_columns(self.capacity)
+        return {col: data[:n] for col, data in self._columns.items()}
+
+
+def window_columns(n):
+    """ Function to allocate the time, range and rpw columns of a raw LiDAR window of n records. """
+    return {'time': np.empty(n), 'range': np.empty(n), 'rpw': np.empty(n, dtype=np.uint32)}
+
+
+def decompress_partial(raw, xz=False):
+    """ Function to decompress the gz members or xz streams of a raw LiDAR data file. A file which is still being
+    transferred ends in a cut off member, whose data is decompressed up to where the file ends. Returns the data and
+    whether the file was complete. """
+    parts = []
+    while raw:
+        raw = raw.lstrip(b'\0')  # xz stream padding, and trailing zeros after gz members which gzip ignores too
+        if not raw:
+            break
+        decompressor = lzma.LZMADecompressor() if xz else zlib.decompressobj(wbits=31)
+        parts.append(decompressor.decompress(raw))
+        if not decompressor.eof:
+            return b''.join(parts), False
+        raw = decompressor.unused_data
+    return b''.join(parts), True
+
+
+def load_gzbin(f, dtype, frame=True):
+    """ Function to load binary data file from LIDAR sensor using gz compression. With frame=False the records
+    are returned as read, without building a dataframe. A partially transferred file is loaded up to its last
+    complete record. """
     if os.path.isfile(f):  # Ensures file exists
-        with gzip.open(f, 'rb') as nf:  # Open file
-            try:
-                file_content = nf.read()  # Read file
-            except EOFError:
-                print('File is still being transfered from LiDAR Station.')
-                sys.exit(0)
+        with open(f, 'rb') as nf:  # Open file
+            file_content, complete = decompress_partial(nf.read(), xz=False)  # Read file
+        if not complete:
+            print('File is still being transfered from LiDAR Station, loading its complete records:', f[-19:])
         filesize = len(file_content)
+        profiling.count(bytes_read=os.path.getsize(f), bytes_decompressed=filesize, rows=filesize // 12)
         data = np.frombuffer(file_content, dtype, count=filesize // 12)  # returns data from file
-        data = {'time': data['time'].astype(float) / 10000, 'range': data['range'].astype(float) / 1000,
-                'rpw': data['rpw']}  # data organization
-        data = pd.DataFrame.from_dict(data)  # creates dataframe
-        data.set_index('time', inplace=True, drop=True)  # sets index as time
+        if frame:
+            data = raw_frame(data)
         print('LiDAR Data loaded from:', f[-19:])
         return data
     else:
         return None
 
 
-def load_xzbin(f, dtype):
-    """ Function to load binary data file from LIDAR sensor using xz compression. """
+def load_xzbin(f, dtype, frame=True):
+    """ Function to load binary data file from LIDAR sensor using xz compression. With frame=False the records
+    are returned as read, without building a dataframe. A partially transferred file is loaded up to its last
+    complete record. """
     if os.path.isfile(f):  # Ensures file exists
-        with lzma.open(f, 'rb') as nf:  # Open file
-            try:
-                file_content = nf.read()  # Read file
-            except EOFError:
-                print('File is still being transfered from LiDAR Station.')
-                sys.exit(0)
+        with open(f, 'rb') as nf:  # Open file
+            file_content, complete = decompress_partial(nf.read(), xz=True)  # Read file
+        if not complete:
+            print('File is still being transfered from LiDAR Station, loading its complete records:', f[-19:])
         filesize = len(file_content)
+        profiling.count(bytes_read=os.path.getsize(f), bytes_decompressed=filesize, rows=filesize // 12)
         data = np.frombuffer(file_content, dtype, count=filesize // 12)  # returns data from file
-        data = {'time': data['time'].astype(float) / 10000, 'range': data['range'].astype(float) / 1000,
-                'rpw': data['rpw']}  # data organization
-        data = pd.DataFrame.from_dict(data)  # creates dataframe
-        data.set_index('time', inplace=True, drop=True)  # sets index as time
+        if frame:
+            data = raw_frame(data)
         print('LiDAR Data loaded from:', f[-19:])
         return data
     else:
@@ -226,18 +420,22 @@ def load_xzbin(f, dtype):
 
 
 ############### Load Six Minute Data ############################################################################
+# Columns of the monthly six minute files
+names_cata_saved = ['time', 'A1', 'A1_t1', 'A1_t2', 'B1', 'E1', 'F1', 'L1_1', 'L1_2', 'P6', 'U1',
+                    'W1', 'l', 'l_Hs', 'l_rpw', 'l_max', 'l_mean', 'l_median', 'l_min', 'l_n', 'l_skew', 'l_std']
+names_harv_saved = ['time', 'D1', 'F1', 'L1_1', 'L1_2', 'N1_1', 'N1_1_ssh', 'N1_2', 'P6', 'U1', 'W1',
+                    'Y1_1', 'Y1_1_ssh', 'Y1_2', 'l', 'l_Hs', 'l_rpw', 'l_max', 'l_mean', 'l_median', 'l_min',
+                    'l_n', 'l_skew', 'l_ssh', 'l_std']
+
+
 def load_output(d, loc, outdir):
-    """ Function to load output data. """
-    names_cata_saved = ['time', 'A1', 'A1_t1', 'A1_t2', 'B1', 'E1', 'F1', 'L1_1', 'L1_2', 'P6', 'U1',
-                        'W1', 'l', 'l_Hs', 'l_rpw', 'l_max', 'l_mean', 'l_median', 'l_min', 'l_n', 'l_skew', 'l_std']
-    names_harv_saved = ['time', 'D1', 'F1', 'L1_1', 'L1_2', 'N1_1', 'N1_1_ssh', 'N1_2', 'P6', 'U1', 'W1',
-                        'Y1_1', 'Y1_1_ssh', 'Y1_2', 'l', 'l_Hs', 'l_rpw', 'l_max', 'l_mean', 'l_median', 'l_min',
-                        'l_n', 'l_skew', 'l_ssh', 'l_std']
+    """ Function to load output data. Files are parsed through load_cached, so the returned data must not be
+    modified. """
     f = os.path.join(outdir, loc + '_' + d.strftime('%Y%m') + '.csv')
     if loc == 'harv':
         try:
-            filedata = pd.read_csv(f, header=0, usecols=range(0, 25), names=names_harv_saved, parse_dates=True,
-                                   index_col=0, na_values='   -   ')
+            filedata = load_cached(f, partial(pd.read_csv, header=0, usecols=range(0, 25), names=names_harv_saved,
+                                              parse_dates=True, index_col=0, na_values='   -   '))
             return filedata
         except IOError:
             data = pd.DataFrame(columns=names_harv_saved)
@@ -245,10 +443,65 @@ def load_output(d, loc, outdir):
             return data
     else:
         try:
-            filedata = pd.read_csv(f, header=0, usecols=range(0, 22), names=names_cata_saved, parse_dates=True,
-                                   index_col=0, na_values='   -   ')
+            filedata = load_cached(f, partial(pd.read_csv, header=0, usecols=range(0, 22), names=names_cata_saved,
+                                              parse_dates=True, index_col=0, na_values='   -   '))
             return filedata
         except IOError:
             data = pd.DataFrame(columns=names_cata_saved)
             data.set_index('time', inplace=True, drop=True)
-            return data
\ No newline at end of file
+            return data
+
+
+_parsed = OrderedDict()
+
+
+def load_cached(f, parse, keep=8):
+    """ Function to load a text data file parsed by parse(f) into a dataframe with a time index. The parsed data is
+    kept in memory for the last keep files and saved as a binary copy next to the file (f + '.npz'), so each version
+    of a file (by size and modification time) is only parsed once. """
+    stat = os.stat(f)
+    key = (f, stat.st_size, stat.st_mtime_ns)
+    if key in _parsed:
+        _parsed.move_to_end(key)
+        return _parsed[key]
+    data = _load_npz(f + '.npz', stat)
+    if data is None:
+        data = parse(f)
+        _save_npz(f + '.npz', data, stat)
+        profiling.count(bytes_read=stat.st_size, rows=len(data))
+    else:
+        profiling.count(bytes_read=os.path.getsize(f + '.npz'), rows=len(data))
+    _parsed[key] = data
+    while len(_parsed) > keep:
+        _parsed.popitem(last=False)
+    return data
+
+
+def _load_npz(fnpz, stat):
+    """ Function to load a binary copy written by _save_npz. Returns None if there is none or it is out of date. """
+    try:
+        with np.load(fnpz, allow_pickle=False) as npz:
+            if int(npz['size']) != stat.st_size or int(npz['mtime']) != stat.st_mtime_ns:
+                return None
+            columns = [str(col) for col in npz['columns']]
+            index = pd.DatetimeIndex(npz['index'], name=str(npz['index_name']) or None)
+            return pd.DataFrame({col: npz['col_' + str(i)] for i, col in enumerate(columns)}, index=index,
+                                columns=columns)
+    except (IOError, OSError, KeyError, ValueError):
+        return None
+
+
+def _save_npz(fnpz, data, stat):
+    """ Function to save a dataframe with a time index and numeric columns as a binary copy of a text file. Other
+    dataframes, and directories which can not be written, are skipped. """
+    if not isinstance(data.index, pd.DatetimeIndex) or any(dtype == object for dtype in data.dtypes):
+        return
+    cols = {'col_' + str(i): data[col].to_numpy() for i, col in enumerate(data.columns)}
+    try:
+        with open(fnpz + '.tmp', 'wb') as fh:
+            np.savez(fh, index=data.index.values, index_name=data.index.name or '',
+                     columns=np.array([str(col) for col in data.columns]), size=stat.st_size, mtime=stat.st_mtime_ns,
+                     **cols)
+        os.replace(fnpz + '.tmp', fnpz)
+    except OSError:
+        pass
@@ -0,0 +1,66 @@
+import warnings
+import numpy as np
+
+
+# Scale of the median absolute deviation to the standard deviation of normally distributed data
+mad_scale = 1.482602218505602
+
+
+########################## Sigma Clipping ####################################################################
+def moments(data, mask, method='std'):
+    """ Function to compute the center and scale of the values of data where mask is True along the last axis.
+    method 'std' uses the mean and standard deviation, 'mad' the median and the scaled median absolute deviation.
+    Returns arrays with a last axis of length 1 which broadcast against data. """
+    data = np.broadcast_to(data, np.broadcast_shapes(np.shape(data), np.shape(mask)))
+    if method == 'std':
+        n = np.count_nonzero(mask, axis=-1)[..., None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            center = np.sum(data, axis=-1, where=mask, keepdims=True) / n
+            dev = data - center
+            scale = np.sqrt(np.sum(dev * dev, axis=-1, where=mask, keepdims=True) / n)
+    elif method == 'mad':
+        masked = np.where(mask, data, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN rows
+            center = np.nanmedian(masked, axis=-1, keepdims=True)
+            scale = mad_scale * np.nanmedian(np.abs(masked - center), axis=-1, keepdims=True)
+    else:
+        raise ValueError('Unknown clipping method: ' + str(method))
+    return center, scale
+
+
+def clip(data, nsigma=3., iterations=1, method='std'):
+    """ Function to split data into included values and outliers more than nsigma scales from the center, along the
+    last axis so that each row of a 2-D array is clipped separately. Values on the bound are included and missing
+    (NaN) values are in neither set. With iterations > 1 the center and scale are recomputed from the included values
+    until no value changes sets or iterations passes are done (None clips until nothing changes). nsigma can be an
+    array which broadcasts against the leading axes of data, see sweep. Returns the boolean masks (included,
+    outlier). """
+    data = np.asarray(data, dtype=float)
+    nsigma = np.asarray(nsigma, dtype=float)[..., None]
+    shape = np.broadcast_shapes(data.shape, nsigma.shape)
+
+    # Clip rows of a 2-D view, recomputing the moments only for rows which changed in the last pass
+    rows = np.broadcast_to(data, shape).reshape(int(np.prod(shape[:-1])), shape[-1])
+    nsigma = np.broadcast_to(nsigma, shape[:-1] + (1,)).reshape(-1, 1)
+    valid = np.isfinite(rows)
+    included = valid.copy()
+    active = np.arange(len(rows))
+    i = 0
+    while len(active) and (iterations is None or i < iterations):
+        center, scale = moments(rows[active], included[active], method)
+        new = valid[active] & (np.abs(rows[active] - center) <= nsigma[active] * scale)
+        changed = np.any(new != included[active], axis=-1)
+        included[active] = new
+        active = active[changed]
+        i += 1
+    included = included.reshape(shape)
+    return included, valid.reshape(shape) & ~included
+
+
+def sweep(data, nsigmas, iterations=1, method='std'):
+    """ Function to clip data at every threshold in nsigmas at once. Returns masks (included, outlier) with a
+    leading axis over the thresholds. """
+    data = np.asarray(data, dtype=float)
+    nsigmas = np.reshape(np.asarray(nsigmas, dtype=float), (-1,) + (1,) * (data.ndim - 1))
+    return clip(data, nsigmas, iterations, method)
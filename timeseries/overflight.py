@@ -1,112 +1,265 @@
 import numpy as np
 import pandas as pd
 import datetime as dt
+import os
 import sys
-from scipy import stats
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from dateutil.relativedelta import relativedelta
-from . import reg, loading
-import dateutil.parser as parser
+from . import reg, loading, profiling
 
 
-def ovavg(ovfile, loc, outDir, rawdir):
+def ovavg(ovfile, loc, outDir, rawdir, jobs=1, cache_mb=512, window_mb=64):
     """ This funcion finds LiDAR data at specific times inputted in a file. """
     print('-------------------------------------')
-    ovflight_times = pd.read_csv(ovfile, names=['date', 'time'], usecols=[0, 1], sep="\s+")
-    try:
-        ovflight_times = [parser.parse(ovflight_times['date'][i] + " " + ovflight_times['time'][i])
-                          for i in range(len(ovflight_times))]
-    except (TypeError, ValueError):
-        ov_secs = [float(ovflight_times['date'][i]) for i in range(len(ovflight_times))]
-        J2000 = dt.datetime(2000, 1, 1, 12)
-        ovflight_times = [J2000 + dt.timedelta(seconds=i) for i in ov_secs]
+    return ovavg_times(read_ovtimes(ovfile), loc, outDir, rawdir, jobs, cache_mb, window_mb)
+
+
+def ovload(ovfile, loc, outDir, rawdir, ov_outfile, incremental=False, jobs=1, cache_mb=512, store=None,
+           mission='j3', window_mb=64):
+    """ Function to average the overflights in ovfile and write them to ov_outfile, along with the sizes and
+    modification times of the input files of each overflight. If incremental is True, only overflights which are not
+    in ov_outfile yet or whose input files changed are averaged and the rest are kept from ov_outfile. If a
+    store.Store is given the overflights are saved to it under loc and mission instead, and only the averaged
+    overflights are written. """
+    plan = ovplan(ovfile, loc, outDir, rawdir, ov_outfile, incremental, store, mission)
+    data_ov = ovavg_times(plan['todo'], loc, outDir, rawdir, jobs, cache_mb, window_mb)
+    return ovsave(plan, data_ov, store)
+
+
+def ovplan(ovfile, loc, outDir, rawdir, ov_outfile, incremental=False, store=None, mission='j3'):
+    """ Function to find the overflights of ovfile which ovload averages. Returns a dictionary with the overflights
+    to average (todo) and what ovsave needs to write them, so the overflights of several missions at a site can be
+    averaged together. """
+    print('-------------------------------------')
+    ovflight_times = read_ovtimes(ovfile)
+    inputs = pd.Series([input_signature(t, loc, outDir, rawdir) for t in ovflight_times],
+                       index=pd.DatetimeIndex(ovflight_times, name='time'), name='inputs')
+    plan = {'loc': loc, 'mission': mission, 'ov_outfile': ov_outfile, 'inputs': inputs, 'data_old': None}
+    f_inputs = os.path.splitext(ov_outfile)[0] + '_inputs.csv'
+
+    if store is not None:
+        if incremental:
+            inputs_old = store.inputs(loc, mission, inputs.index)
+            plan['todo'] = [t for t, new, old in zip(ovflight_times, inputs, inputs_old) if new != old]
+            print('Averaging', len(plan['todo']), 'new or changed of', len(ovflight_times), 'overflights.')
+        else:
+            plan['todo'] = ovflight_times
+    elif incremental and os.path.isfile(ov_outfile) and os.path.isfile(f_inputs):
+        data_old = pd.read_csv(ov_outfile, index_col=0, parse_dates=[0], float_precision='round_trip')
+        # Overflights without input files have an empty signature, which must not be read back as missing
+        inputs_old = pd.read_csv(f_inputs, index_col=0, parse_dates=[0], keep_default_na=False)['inputs']
+        inputs_old = inputs_old[~inputs_old.index.duplicated()].reindex(inputs.index)
+        plan['todo'] = [t for t, new, old in zip(ovflight_times, inputs, inputs_old)
+                        if new != old or t not in data_old.index]
+        plan['data_old'] = data_old
+        print('Averaging', len(plan['todo']), 'new or changed of', len(ovflight_times), 'overflights.')
+    else:
+        plan['todo'] = ovflight_times
+    return plan
+
+
+def ovsave(plan, data_ov, store=None):
+    """ Function to write the overflights averaged for a plan of ovplan to the store, or to the overflight file
+    along with the ones kept from it. data_ov may hold other overflights as well, only those of the plan are
+    written. """
+    data_ov = data_ov.reindex(pd.DatetimeIndex(plan['todo'], name='time'))
+    inputs = plan['inputs']
+    if store is not None:
+        store.upsert(plan['loc'], plan['mission'], data_ov, inputs[data_ov.index])
+        return data_ov
+    data_old = plan['data_old']
+    if data_old is not None:
+        data_old = data_old[~data_old.index.duplicated() & ~data_old.index.isin(data_ov.index)]
+        data_ov = pd.concat([data_old, data_ov[~data_ov.index.duplicated()]]).reindex(inputs.index)
+    data_ov.to_csv(plan['ov_outfile'], na_rep='NaN')
+    inputs.to_csv(os.path.splitext(plan['ov_outfile'])[0] + '_inputs.csv')
+    return data_ov
+
+
+def read_ovtimes(ovfile):
+    """ Function to read the overflight times from the first column(s) of a satellite data file. """
+    ovflight_times = list(loading.read_satellite(ovfile)[0].astype(object))
 
-    timedelta_2h = dt.timedelta(hours=2)
-    timedelta_1100s = dt.timedelta(seconds=1100)
     for i in ovflight_times:
         if not isinstance(i, dt.date):
             print("""Incorrect Data Format:
                      Input must be vertical list of dates in standard format
                      so that dateutil date parser can detect type. """)
             sys.exit(0)
+    return ovflight_times
+
+
+def ovavg_times(ovflight_times, loc, outDir, rawdir, jobs=1, cache_mb=512, window_mb=64):
+    """ Function to average LiDAR, Bubbler, Radar and Acoustic data around each overflight time. Overflights are
+    independent, so with jobs > 1 they are processed in a pool of worker processes and merged back in input order.
+    Decoded raw day files are kept in a cache of at most cache_mb megabytes and the LiDAR windows are assembled in a
+    loading.WindowBuffer of window_mb megabytes (per worker). """
+    if jobs > 1 and len(ovflight_times) > 1:
+        # Chunks of neighbouring overflights go to each worker so they share that worker's raw data cache. Output
+        # is captured in the worker and printed here so passes do not interleave.
+        chunks = _chunk_overflights(ovflight_times, 4 * jobs)
+        rows = []
+        cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for results, stats_chunk, records in pool.map(_ovavg_chunk, chunks, repeat(loc), repeat(outDir),
+                                                          repeat(rawdir), repeat(cache_mb), repeat(window_mb),
+                                                          repeat(profiling.state())):
+                for row, log in results:
+                    print(log, end='')
+                    rows.append(row)
+                for key in cache_stats:
+                    cache_stats[key] += stats_chunk[key]
+                profiling.add(records)
+    else:
+        cache = loading.RawCache(cache_mb)
+        buffer = loading.WindowBuffer(window_mb)
+        rows = []
+        for t in ovflight_times:
+            with profiling.stage('overflight', site=loc, time=t):
+                rows.append(ovavg_single(t, loc, outDir, rawdir, cache, buffer))
+        cache_stats = cache.stats()
+    print('Raw LiDAR cache: {hits} hits, {misses} misses, {evictions} evictions'.format(**cache_stats))
+
+    data_ov = pd.DataFrame(rows, index=pd.DatetimeIndex(ovflight_times, name='time'))
+    return data_ov
+
+
+def _chunk_overflights(times, nchunks):
+    """ Splits overflight times into about nchunks contiguous chunks, only breaking a chunk between days. """
+    size = max(1, -(-len(times) // nchunks))
+    chunks = [[]]
+    for t in times:
+        if len(chunks[-1]) >= size and t.date() != chunks[-1][-1].date():
+            chunks.append([])
+        chunks[-1].append(t)
+    return chunks
+
 
-    data_ov = pd.DataFrame({'time': ovflight_times})
-    data_ov.set_index('time', inplace=True, drop=True)
-    for t in ovflight_times:
-        print(t)
-        # Load LiDAR Data
-        datamark = True
-        data = loading.load_raw(t, rawdir)
-        day_dt = (t - timedelta_2h)
-        day = dt.datetime(day_dt.year, day_dt.month, day_dt.day)
-        if (t - timedelta_2h).date() != t.date():  # If data will span current and previous day
-            data_before = loading.load_raw(t - dt.timedelta(days=1), rawdir)
-            if data is None and data_before is None:
-                print('No data for this overflight.')
-                datamark = False
-            else:
-                data.index = data.index + 24 * 60 * 60
-                data = pd.concat([data_before, data])
-
-        elif (t + timedelta_2h).date() != t.date():  # if data will span current and next day
-            data_after = loading.load_raw(t + dt.timedelta(days=1), rawdir)
-            if data is None and data_after is None:
-                print('No LiDAR data for this overflight.')
-                datamark = False
-            else:
-                data_after.index = data_after.index + 24 * 60 * 60
-                data = pd.concat([data_before, data])
-
-        elif data is None:
+def _ovavg_chunk(times, loc, outDir, rawdir, cache_mb, window_mb=64, profile=(False, 0., '')):
+    """ Worker function for ovavg which returns the results and printed output of each overflight in a chunk,
+    along with the counters of the raw data cache used for the chunk and the profiling records. """
+    profiling.enable(*profile)
+    cache = loading.RawCache(cache_mb)
+    buffer = loading.WindowBuffer(window_mb)
+    results = []
+    for t in times:
+        with profiling.stage('overflight', site=loc, time=t):
+            results.append(profiling.captured(ovavg_single, t, loc, outDir, rawdir, cache, buffer))
+    return results, cache.stats(), profiling.take()
+
+
+def _load_lidar(day, t1, t2, rawdir, cache=None, buffer=None):
+    """ Function to load the raw LiDAR data between t1 and t2 seconds after the start of day, which may run into the
+    next day. Only the slices of the window are read from each day, and they are written into the columns of buffer
+    (a loading.WindowBuffer) if one is given, so the returned arrays are only valid until the next window. Returns
+    arrays of the time in seconds after the start of day, range in meters and received pulse width, sorted by time,
+    or None if there are no day files. """
+    windows = []
+    offset = 0
+    while offset <= t2:
+        window = loading.load_raw_window(day + dt.timedelta(seconds=offset), t1 - offset, t2 - offset, rawdir, cache,
+                                         frame=False)
+        if window is not None:
+            windows.append((offset, window))
+        offset += 24 * 60 * 60
+    if not windows:
+        return None
+    n = sum(len(window['time']) for _, window in windows)
+    data = loading.window_columns(n) if buffer is None else buffer.columns(n)
+    time, r_range, r_rpw = data['time'], data['range'], data['rpw']
+    i = 0
+    for offset, window in windows:
+        j = i + len(window['time'])
+        np.divide(window['time'], 10000, out=time[i:j])
+        time[i:j] += offset
+        np.divide(window['range'], 1000, out=r_range[i:j])
+        r_rpw[i:j] = window['rpw']
+        i = j
+    i1, i2 = np.searchsorted(time, t1, 'left'), np.searchsorted(time, t2, 'right')
+    return time[i1:i2], r_range[i1:i2], r_rpw[i1:i2]
+
+
+def input_signature(t, loc, outDir, rawdir):
+    """ Function to describe the input files of the overflight at t by name, size and modification time, so changed
+    inputs can be detected. """
+    timedelta_2h = dt.timedelta(hours=2)
+    files = [loading.raw_file(t - timedelta_2h, rawdir), loading.raw_file(t + timedelta_2h, rawdir)]
+    for m in sorted({(t - timedelta_2h).strftime('%Y%m'), (t + timedelta_2h).strftime('%Y%m')}):
+        files.append(os.path.join(outDir, loc + '_' + m + '.csv'))
+    signature = []
+    for f in sorted(set(f for f in files if f is not None)):
+        try:
+            stat = os.stat(f)
+            signature.append(os.path.basename(f) + ':' + str(stat.st_size) + ':' + str(stat.st_mtime_ns))
+        except OSError:
+            pass
+    return ' '.join(signature)
+
+
+def ovavg_single(t, loc, outDir, rawdir, cache=None, buffer=None):
+    """ Function to average LiDAR, Bubbler, Radar and Acoustic data around a single overflight. Returns a dictionary
+    of the columns of the overflight file. Raw day files are loaded through cache and the LiDAR window is assembled in
+    buffer if they are given. """
+    timedelta_2h = dt.timedelta(hours=2)
+    timedelta_1100s = dt.timedelta(seconds=1100)
+    row = {}
+    print(t)
+    # Load LiDAR Data
+    day_dt = (t - timedelta_2h)
+    day = dt.datetime(day_dt.year, day_dt.month, day_dt.day)
+    with profiling.stage('raw_lidar'):
+        data = _load_lidar(day, ((t - timedelta_2h) - day).total_seconds(),
+                           ((t + timedelta_2h) - day).total_seconds(), rawdir, cache, buffer)
+    datamark = data is not None
+    if not datamark:
+        print('No LiDAR data for this overflight.')
+
+    if datamark:
+        # LiDAR Averaging for 2 hour quadratic
+        time_2h, r_range_2h, r_rpw_2h = data
+        # std_int = np.std(r_range_2h)
+        # mean_int = np.mean(r_range_2h)
+        # ind_good = ((np.abs(r_range_2h - mean_int)) < (5 * std_int))
+        # r_range_2h = r_range_2h[ind_good]
+        # r_rpw_2h = r_rpw_2h[ind_good]
+        # time_2h = time_2h[ind_good]
+
+        # LiDAR Averaging for 1100s
+        t1 = ((t - timedelta_1100s) - day).total_seconds()
+        t2 = ((t + timedelta_1100s) - day).total_seconds()
+        i1, i2 = np.searchsorted(time_2h, t1, 'left'), np.searchsorted(time_2h, t2, 'right')
+        r_range_1100 = r_range_2h[i1:i2]
+        r_rpw_1100 = r_rpw_2h[i1:i2]
+        time_1100 = time_2h[i1:i2]
+        # std_int = np.std(r_range_1100)
+        # mean_int = np.mean(r_range_1100)
+        # ind_good = ((np.abs(r_range_1100 - mean_int)) < (5 * std_int))
+        # r_range_1100 = r_range_1100[ind_good]
+        # r_rpw_1100 = r_rpw_1100[ind_good]
+        # time_1100 = time_1100[ind_good]
+
+        l_r = len(r_range_1100)
+        profiling.count(points=len(r_range_2h))
+        if l_r > 0:
+            print('LiDAR Data Points (+-2h window): ', l_r)
+            row['l_mean'] = np.mean(r_range_1100)
+            row['l_median'] = np.median(r_range_1100)
+            row['l_std'] = np.std(r_range_1100)
+            from scipy import stats  # scipy.stats is slow to import, so only when averaging
+            row['l_skew'] = stats.skew(r_range_1100)
+            row['l_n'] = l_r
+            row['l_min'] = np.min(r_range_1100)
+            row['l_max'] = np.max(r_range_1100)
+            row['l_rpw'] = np.mean(r_rpw_1100)
+            row['l_quad2h'] = reg.quadreg_lid(time_2h, r_range_2h, t, day)
+            row['l_lin1100s'] = reg.linreg_lid(time_1100, r_range_1100, t, day)
+        else:
             print('No LiDAR data for this overflight.')
-            datamark = False
-
-        if datamark:
-            # LiDAR Averaging for 2 hour quadratic
-            t1 = ((t - timedelta_2h) - day).total_seconds()
-            t2 = ((t + timedelta_2h) - day).total_seconds()
-            ind = (data.index >= t1) & (data.index <= t2)
-            r_range_2h = data['range'][ind]
-            r_rpw_2h = data['rpw'][ind]
-            time_2h = data.index[ind]
-            # std_int = np.std(r_range_2h)
-            # mean_int = np.mean(r_range_2h)
-            # ind_good = ((np.abs(r_range_2h - mean_int)) < (5 * std_int))
-            # r_range_2h = r_range_2h[ind_good]
-            # r_rpw_2h = r_rpw_2h[ind_good]
-            # time_2h = time_2h[ind_good]
-
-            # LiDAR Averaging for 1100s
-            t1 = ((t - timedelta_1100s) - day).total_seconds()
-            t2 = ((t + timedelta_1100s) - day).total_seconds()
-            ind = (data.index >= t1) & (data.index <= t2)
-            r_range_1100 = data['range'][ind]
-            r_rpw_1100 = data['rpw'][ind]
-            time_1100 = data.index[ind]
-            # std_int = np.std(r_range_1100)
-            # mean_int = np.mean(r_range_1100)
-            # ind_good = ((np.abs(r_range_1100 - mean_int)) < (5 * std_int))
-            # r_range_1100 = r_range_1100[ind_good]
-            # r_rpw_1100 = r_rpw_1100[ind_good]
-            # time_1100 = time_1100[ind_good]
-
-            l_r = len(r_range_1100)
-            if l_r > 0:
-                print('LiDAR Data Points (+-2h window): ', l_r)
-                data_ov.loc[t, 'l_mean'] = np.mean(r_range_1100)
-                data_ov.loc[t, 'l_median'] = np.median(r_range_1100)
-                data_ov.loc[t, 'l_std'] = np.std(r_range_1100)
-                data_ov.loc[t, 'l_skew'] = stats.skew(r_range_1100)
-                data_ov.loc[t, 'l_n'] = l_r
-                data_ov.loc[t, 'l_min'] = np.min(r_range_1100)
-                data_ov.loc[t, 'l_max'] = np.max(r_range_1100)
-                data_ov.loc[t, 'l_rpw'] = np.mean(r_rpw_1100)
-                data_ov.loc[t, 'l_quad2h'] = reg.quadreg_lid(time_2h, r_range_2h, t, day)
-                data_ov.loc[t, 'l_lin1100s'] = reg.linreg_lid(time_1100, r_range_1100, t, day)
-            else:
-                print('No LiDAR data for this overflight.')
-            del r_range_2h, r_rpw_2h
-
-        # Bubbler and Radar Data
+        del r_range_2h, r_rpw_2h
+
+    # Bubbler and Radar Data
+    with profiling.stage('six_minute'):
         filedata = loading.load_output(t, loc, outDir)
         if (t - timedelta_2h).month != t.month:  # If data will span current and previous month
             filedata2 = loading.load_output(t - relativedelta(months=1), loc, outDir)
@@ -116,80 +269,82 @@ def ovavg(ovfile, loc, outDir, rawdir):
             filedata2 = loading.load_output(t + relativedelta(months=1), loc, outDir)
             filedata = pd.concat([filedata, filedata2])
 
-        if loc == 'harv':
-            t1 = (t - timedelta_2h)
-            t2 = (t + timedelta_2h)
-            ind = (filedata.index >= t1) & (filedata.index <= t2)
-            bub = filedata['N1_1'][ind].astype(float)
-            rad = filedata['Y1_1'][ind].astype(float)
-            lid = filedata['l_mean'][ind].astype(float)
-            time = filedata.index[ind]
-
-            # std_bub = np.std(bub)
-            # std_rad = np.std(rad)
-            # std_lid = np.std(lid)
-            # mean_bub = np.mean(bub)
-            # mean_rad = np.mean(rad)
-            # mean_lid = np.mean(lid)
-            # ind_good_bub = ((np.abs(bub - mean_bub)) < (5 * std_bub))
-            # ind_good_rad = ((np.abs(rad - mean_rad)) < (5 * std_rad))
-            # ind_good_lid = ((np.abs(lid - mean_lid)) < (5 * std_lid))
-            #
-            # bub = bub[ind_good_bub]
-            # timebub = time[ind_good_bub]
-            # rad = rad[ind_good_rad]
-            # timerad = time[ind_good_rad]
-            # lid = lid[ind_good_lid]
-            # time_lid = time[ind_good_lid]
-
-            l_r = len(rad)
-            l_b = len(bub)
-            l_l = len(lid)
-            if l_b > 0:
-                print('Bubbler Data Points (+-2h window): ', l_b)
-                data_ov.loc[t, 'bub'] = reg.quadreg_lid(time, bub, t, day)
-            else:
-                print('No Bubbler data for this overflight.')
-            if l_r > 0:
-                print('Radar Data Points (+-2h window): ', l_r)
-                data_ov.loc[t, 'rad'] = reg.quadreg_lid(time, rad, t, day)
-            else:
-                print('No Radar data for this overflight.')
-            if l_l > 0:
-                print('LiDAR 6 minute Data Points (+-2h window): ', l_l)
-                data_ov.loc[t, 'l_6m_quad2h'] = reg.quadreg_lid(time, lid, t, day)
-            else:
-                print('No 6 minute LiDAR data for this overflight.')
-
-        elif loc == 'cata':
-            t1 = (t - timedelta_2h)
-            t2 = (t + timedelta_2h)
-            ind = (filedata.index >= t1) & (filedata.index <= t2)
-            acoust = filedata['A1'][ind].astype(float)
-            lid = filedata['l_mean'][ind].astype(float)
-            time = filedata.index[ind]
-            # std_acoust = np.std(acoust)
-            # mean_acoust = np.mean(acoust)
-            # std_lid = np.std(lid)
-            # mean_lid = np.mean(lid)
-            # ind_good_acoust = ((np.abs(acoust - mean_acoust)) < (5 * std_acoust))
-            # ind_good_lid = ((np.abs(lid - mean_lid)) < (5 * std_lid))
-
-            # acoust = acoust[ind_good_acoust]
-            # time_acoust = time[ind_good_acoust]
-            # lid = lid[ind_good_lid]
-            # time_lid = time[ind_good_lid]
-            l_a = len(acoust)
-            l_l = len(lid)
-            if l_a > 0:
-                data_ov.loc[t, 'acoust'] = reg.quadreg_lid(time, acoust, t, day)
-                print('Acoustic Data Points (+-2h window): ', l_a)
-            else:
-                print('No Acoustic data for this overflight.')
-            if l_l > 0:
-                print('LiDAR 6 minute Data Points (+-2h window): ', l_l)
-                data_ov.loc[t, 'l_6m_quad2h'] = reg.quadreg_lid(time, lid, t, day)
-            else:
-                print('No 6 minute LiDAR data for this overflight.')
-        print('-------------------------------------')
-    return data_ov
+    if loc == 'harv':
+        t1 = (t - timedelta_2h)
+        t2 = (t + timedelta_2h)
+        ind = (filedata.index >= t1) & (filedata.index <= t2)
+        bub = filedata['N1_1'][ind].astype(float)
+        rad = filedata['Y1_1'][ind].astype(float)
+        lid = filedata['l_mean'][ind].astype(float)
+        time = filedata.index[ind]
+
+        # std_bub = np.std(bub)
+        # std_rad = np.std(rad)
+        # std_lid = np.std(lid)
+        # mean_bub = np.mean(bub)
+        # mean_rad = np.mean(rad)
+        # mean_lid = np.mean(lid)
+        # ind_good_bub = ((np.abs(bub - mean_bub)) < (5 * std_bub))
+        # ind_good_rad = ((np.abs(rad - mean_rad)) < (5 * std_rad))
+        # ind_good_lid = ((np.abs(lid - mean_lid)) < (5 * std_lid))
+        #
+        # bub = bub[ind_good_bub]
+        # timebub = time[ind_good_bub]
+        # rad = rad[ind_good_rad]
+        # timerad = time[ind_good_rad]
+        # lid = lid[ind_good_lid]
+        # time_lid = time[ind_good_lid]
+
+        l_r = len(rad)
+        l_b = len(bub)
+        l_l = len(lid)
+        profiling.count(points=l_r + l_b + l_l)
+        if l_b > 0:
+            print('Bubbler Data Points (+-2h window): ', l_b)
+            row['bub'] = reg.quadreg_lid(time, bub, t, day)
+        else:
+            print('No Bubbler data for this overflight.')
+        if l_r > 0:
+            print('Radar Data Points (+-2h window): ', l_r)
+            row['rad'] = reg.quadreg_lid(time, rad, t, day)
+        else:
+            print('No Radar data for this overflight.')
+        if l_l > 0:
+            print('LiDAR 6 minute Data Points (+-2h window): ', l_l)
+            row['l_6m_quad2h'] = reg.quadreg_lid(time, lid, t, day)
+        else:
+            print('No 6 minute LiDAR data for this overflight.')
+
+    elif loc == 'cata':
+        t1 = (t - timedelta_2h)
+        t2 = (t + timedelta_2h)
+        ind = (filedata.index >= t1) & (filedata.index <= t2)
+        acoust = filedata['A1'][ind].astype(float)
+        lid = filedata['l_mean'][ind].astype(float)
+        time = filedata.index[ind]
+        # std_acoust = np.std(acoust)
+        # mean_acoust = np.mean(acoust)
+        # std_lid = np.std(lid)
+        # mean_lid = np.mean(lid)
+        # ind_good_acoust = ((np.abs(acoust - mean_acoust)) < (5 * std_acoust))
+        # ind_good_lid = ((np.abs(lid - mean_lid)) < (5 * std_lid))
+
+        # acoust = acoust[ind_good_acoust]
+        # time_acoust = time[ind_good_acoust]
+        # lid = lid[ind_good_lid]
+        # time_lid = time[ind_good_lid]
+        l_a = len(acoust)
+        l_l = len(lid)
+        profiling.count(points=l_a + l_l)
+        if l_a > 0:
+            row['acoust'] = reg.quadreg_lid(time, acoust, t, day)
+            print('Acoustic Data Points (+-2h window): ', l_a)
+        else:
+            print('No Acoustic data for this overflight.')
+        if l_l > 0:
+            print('LiDAR 6 minute Data Points (+-2h window): ', l_l)
+            row['l_6m_quad2h'] = reg.quadreg_lid(time, lid, t, day)
+        else:
+            print('No 6 minute LiDAR data for this overflight.')
+    print('-------------------------------------')
+    return row
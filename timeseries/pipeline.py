@@ -0,0 +1,57 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from . import profiling
+
+
+########################## Task Graph ########################################################################
+class Task(object):
+    """ A stage of a pipeline: func is called with the results of the tasks named in deps followed by args and
+    kwargs, after the tasks named in deps and after are done. Its result is passed on to the tasks which depend on
+    it. Functions, arguments and results must be picklable to run in a worker process. """
+    def __init__(self, name, func, args=(), kwargs=None, deps=(), after=()):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+        self.deps = tuple(deps)
+        self.after = tuple(after)
+
+
+def run(tasks, jobs=1):
+    """ Function to run a graph of tasks. With jobs > 1 every task whose dependencies are done is started in a pool of
+    jobs worker processes, so independent tasks overlap, and the printed output of each task is shown when it is
+    done. Otherwise the tasks run here in the order given. Returns a dictionary of the results by task name. """
+    names = set()
+    for task in tasks:
+        missing = [dep for dep in task.deps + task.after if dep not in names]
+        if missing:
+            raise ValueError('Task ' + task.name + ' depends on tasks which are not before it: ' + ', '.join(missing))
+        names.add(task.name)
+
+    results = {}
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            results[task.name] = task.func(*[results[dep] for dep in task.deps], *task.args, **task.kwargs)
+        return results
+
+    todo = list(tasks)
+    running = {}
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        while todo or running:
+            for task in [task for task in todo if all(dep in results for dep in task.deps + task.after)]:
+                todo.remove(task)
+                running[pool.submit(_run_task, task.func, [results[dep] for dep in task.deps] + list(task.args),
+                                    task.kwargs, profiling.state())] = task
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                results[task.name], log, records = future.result()
+                print(log, end='')
+                profiling.add(records)
+    return results
+
+
+def _run_task(func, args, kwargs, profile=(False, 0., '')):
+    """ Worker function for run which returns the result, printed output and profiling records of a task. """
+    profiling.enable(*profile)
+    result, log = profiling.captured(func, *args, **kwargs)
+    return result, log, profiling.take()
@@ -0,0 +1,36 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import matplotlib.dates as pltdt
+from pandas.plotting import register_matplotlib_converters
+register_matplotlib_converters()
+
+
+########################## Plot Bias Time Series #############################################################
+def plot_bias(s, title, plotfile, dpi=500):
+    """ Function to plot a bias time series summary from bias.summarize with its outliers and linear fit. A bootstrap
+    interval of the slope in the summary is shown after the slope. """
+    time, data, not_ind, out_ind = s['time'], s['data'], s['not_ind'], s['out_ind']
+
+    # Plot Time Series
+    fig, ax = plt.subplots()
+    ax.plot_date(pltdt.date2num(time)[not_ind], data[not_ind], 'g-v',
+                 label='Included Data (' + str(len(not_ind)) + '), Variance=' + str(round(s['std'], 3)) + "mm")
+    ax.plot_date(pltdt.date2num(time)[out_ind], data[out_ind], 'rv',
+                 label='3$\sigma$ Outliers (' + str(len(out_ind)) + ')')
+    b1 = str(round(s['b1'], 3))
+    if 'b1_lo' in s:
+        b1 += ' [' + str(round(s['b1_lo'], 3)) + ', ' + str(round(s['b1_hi'], 3)) + ']'
+    ax.plot_date(pltdt.date2num(time[not_ind]), s['yfit'], 'b--',
+                 label='Linear Fit, R$^2$=' + str(round(s['r2'], 6)) + ", b$_1$=" + b1 + " mm/yr")
+
+    # Set axes parameters
+    ax.set_title(title)
+    ax.set_xlabel('Time')
+    ax.set_ylabel('SSH Bias [mm]')
+    ax.set_ylim(-200, 300)
+    ax.xaxis.set_tick_params(rotation=30, labelsize=10)
+    ax.legend()
+    ax.grid()
+    fig.savefig(plotfile, dpi=dpi, bbox_inches='tight')
+    plt.close()
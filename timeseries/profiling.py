@@ -0,0 +1,131 @@
+import io
+import csv
+import json
+import time
+from contextlib import contextmanager, redirect_stdout
+
+
+# Counters of every stage record, added to with count()
+counters = ('bytes_read', 'bytes_decompressed', 'rows', 'points')
+
+_enabled = False
+_start = 0.
+_parent = ''
+_open = []
+_records = []
+
+
+########################## Stage Records #####################################################################
+def enable(on=True, start=None, parent=''):
+    """ Function to turn recording of stages on or off and forget earlier records. Recording is off unless --profile
+    is given. Record start times are relative to start (a time.perf_counter value) and stages outside any other
+    stage get parent as their parent. Worker processes get these arguments from state. """
+    global _enabled, _start, _parent
+    _enabled = on
+    _start = time.perf_counter() if start is None else start
+    _parent = parent
+    del _open[:]
+    del _records[:]
+
+
+def enabled():
+    """ Returns True if stages are being recorded. """
+    return _enabled
+
+
+def state():
+    """ Returns the arguments of enable which make a worker process record like this process. """
+    return _enabled, _start, _open[-1]['stage'] if _open else _parent
+
+
+@contextmanager
+def stage(name, **info):
+    """ Context manager recording the wall time, CPU time and counters of a stage, with info as extra columns. Stages
+    can be nested, and the counters of a stage include those of the stages inside it. """
+    if not _enabled:
+        yield
+        return
+    record = {'stage': name, 'parent': _open[-1]['stage'] if _open else _parent}
+    record.update(info)
+    record.update((key, 0) for key in counters)
+    _open.append(record)
+    wall, cpu = time.perf_counter(), time.process_time()
+    record['start_s'] = wall - _start
+    try:
+        yield
+    finally:
+        record['wall_s'] = time.perf_counter() - wall
+        record['cpu_s'] = time.process_time() - cpu
+        _open.remove(record)
+        _records.append(record)
+
+
+def count(**counts):
+    """ Function to add to the counters of the stages being recorded. """
+    for record in _open:
+        for key, value in counts.items():
+            record[key] = record.get(key, 0) + int(value)
+
+
+def take():
+    """ Returns and forgets the finished stage records, for worker processes to send them back. """
+    records = list(_records)
+    del _records[:]
+    return records
+
+
+def add(records):
+    """ Function to add stage records taken in a worker process. The counters of the outermost worker stages are
+    added to the stages open here. """
+    parent = _open[-1]['stage'] if _open else _parent
+    for record in records:
+        if record['parent'] == parent:
+            count(**{key: record[key] for key in counters})
+    _records.extend(records)
+
+
+
+########################## Worker Output #####################################################################
+def captured(func, *args, **kwargs):
+    """ Function to call func in a worker process with its printed output captured, so the caller can print the
+    output of each worker in order. Returns the result of func and the printed output. """
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        result = func(*args, **kwargs)
+    return result, buf.getvalue()
+
+
+########################## Report ############################################################################
+def summary(records):
+    """ Function to total the records of each stage. Returns a dictionary by stage name. """
+    totals = {}
+    for record in records:
+        total = totals.setdefault(record['stage'], dict({'count': 0, 'wall_s': 0., 'cpu_s': 0.},
+                                                        **{key: 0 for key in counters}))
+        total['count'] += 1
+        for key in ('wall_s', 'cpu_s') + counters:
+            total[key] += record[key]
+    return totals
+
+
+def write_report(freport):
+    """ Function to write the totals and records of all stages to the JSON file freport and the records to a CSV
+    file next to it. """
+    records = sorted(_records, key=lambda record: record['start_s'])
+    totals = summary(records)
+    with open(freport, 'w') as f:
+        json.dump({'summary': totals, 'records': records}, f, indent=2, default=str)
+    columns = ['stage', 'parent', 'start_s', 'wall_s', 'cpu_s'] + list(counters)
+    columns += sorted({key for record in records for key in record} - set(columns))
+    fcsv = freport[:-5] + '.csv' if freport.endswith('.json') else freport + '.csv'
+    with open(fcsv, 'w') as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        writer.writerows(records)
+    print('{:<16} {:>6} {:>10} {:>10} {:>14} {:>14} {:>10} {:>10}'.format(
+        'stage', 'count', 'wall s', 'cpu s', 'read MB', 'decomp MB', 'rows', 'points'))
+    for name, total in totals.items():
+        print('{:<16} {:>6} {:>10.3f} {:>10.3f} {:>14.1f} {:>14.1f} {:>10} {:>10}'.format(
+            name, total['count'], total['wall_s'], total['cpu_s'], total['bytes_read'] / 2 ** 20,
+            total['bytes_decompressed'] / 2 ** 20, total['rows'], total['points']))
+    print('Profile saved to:', freport, 'and', fcsv)
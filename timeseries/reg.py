@@ -15,12 +15,29 @@ def linreg_ts(x, y):
     return(pred, b_0, b_1, r2)
 
 
+def linreg_rows(x, y, mask):
+    """ Function for linear regressions of every row of y on x, using the points where the row of mask is True.
+    Returns arrays of the intercepts, slopes and R^2 of the rows, NaN for rows with fewer than two points. """
+    n = np.count_nonzero(mask, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.sum(np.where(mask, x, 0), axis=-1) / n
+        y_mean = np.sum(np.where(mask, y, 0), axis=-1) / n
+        dx = np.where(mask, x - x_mean[:, None], 0)
+        dy = np.where(mask, y - y_mean[:, None], 0)
+        sxx = np.sum(dx * dx, axis=-1)
+        b_1 = np.sum(dx * dy, axis=-1) / sxx
+        b_0 = y_mean - b_1 * x_mean
+        r2 = b_1 * b_1 * sxx / np.sum(dy * dy, axis=-1)
+    b_1[n < 2] = np.nan
+    b_0[n < 2] = np.nan
+    r2[n < 2] = np.nan
+    return b_0, b_1, r2
+
+
 def quadreg_ts(x, y, t):
     if len(x)>0:
         xnum = np.array([(z-t).total_seconds() for z in x])
-        p = np.polyfit(xnum, y, 2)
-        b_0, b_1, b_2 = p[2], p[1], p[0]
-        return b_0
+        return _intercept(xnum, y, 2)
     else:
         return 0
 
@@ -32,9 +49,7 @@ def quadreg_lid(x, y, t, day):
             xnum = (x - (t - day).total_seconds()) / 3600
         except TypeError:
             xnum = (x - t).total_seconds() / 3600
-        p = np.polyfit(xnum, y, 2)
-        b_0, b_1, b_2 = p[2], p[1], p[0]
-        return b_0
+        return _intercept(xnum, y, 2)
     else:
         return float('nan')
 
@@ -46,8 +61,79 @@ def linreg_lid(x, y, t, day):
             xnum = (x - (t - day).total_seconds()) / 3600
         except TypeError:
             xnum = (x - t).total_seconds() / 3600
-        p = np.polyfit(xnum, y, 1)
-        b_0, b_1 = p[1], p[0]
-        return b_0
+        return _intercept(xnum, y, 1)
     else:
         return float('nan')
+
+
+def _intercept(x, y, deg):
+    """ Function for the intercept of a single polynomial fit. Windows with too few points for polyfit_windows keep
+    the np.polyfit result. """
+    if len(x) <= deg:
+        return np.polyfit(x, y, deg)[-1]
+    return polyfit_windows(x, y, [0, len(x)], deg)[0, 0]
+
+
+########################## Batched Regression ##############################################################
+def polyfit_windows(x, y, offsets, deg=2, full=False):
+    """ Function for fitting a polynomial of degree deg to many windows in one call. x and y hold the windows one
+    after another, window i being x[offsets[i]:offsets[i + 1]] with offsets[0] = 0 and offsets[-1] = len(x), and x
+    should be measured from the point of interest of each window (e.g. the overflight). Returns the coefficients
+    b_0, ..., b_deg of each window as the rows of an array. With full=True the number of points and the residual
+    standard deviation (deg + 1 degrees of freedom removed) of each window are returned as well.
+
+    The fit solves the normal equations built from power sums of x, scaled by the largest |x| of each window. For
+    windows around x = 0 like the overflight windows it agrees with np.polyfit to about 1e-9 of the spread of y.
+    Windows with deg or fewer points or with NaN values give NaN instead of the underdetermined np.polyfit result.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    n = np.diff(offsets)
+    empty = n == 0
+
+    def segsum(v):
+        # reduceat gives v[offsets[i]] for an empty window and needs an element past the end for a trailing one
+        total = np.add.reduceat(np.append(v, 0.), offsets)[:-1]
+        total[empty] = 0
+        return total
+
+    scale = np.maximum.reduceat(np.append(np.abs(x), 0.), offsets)[:-1]
+    scale[empty | (scale == 0) | ~np.isfinite(scale)] = 1
+    xs = x / np.repeat(scale, n)
+
+    # Power sums of x and x * y for the normal equations
+    xpow = np.ones_like(xs)
+    xsum = [segsum(xpow)]
+    ysum = [segsum(y)]
+    for p in range(1, 2 * deg + 1):
+        xpow = xpow * xs
+        xsum.append(segsum(xpow))
+        if p <= deg:
+            ysum.append(segsum(xpow * y))
+    xsum = np.stack(xsum, axis=-1)
+    ysum = np.stack(ysum, axis=-1)
+    j = np.arange(deg + 1)
+    a = xsum[:, j[:, None] + j[None, :]]
+
+    good = n > deg
+    a[~good] = np.eye(deg + 1)
+    ysum[~good] = np.nan
+    try:
+        coef = np.linalg.solve(a, ysum[..., None])[..., 0]
+    except np.linalg.LinAlgError:  # A window with too few distinct x values
+        coef = np.einsum('kij,kj->ki', np.linalg.pinv(a), ysum)
+        coef[np.linalg.matrix_rank(a) <= deg] = np.nan
+    coef = coef / scale[:, None] ** j
+
+    if not full:
+        return coef
+    xrep = np.repeat(np.arange(len(n)), n)
+    pred = np.zeros_like(y)
+    for p in range(deg, -1, -1):
+        pred = pred * x + coef[xrep, p]
+    resid = y - pred
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(segsum(resid ** 2) / (n - deg - 1))
+    std[n <= deg + 1] = np.nan
+    return coef, n, std
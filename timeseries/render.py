@@ -0,0 +1,34 @@
+from concurrent.futures import ProcessPoolExecutor
+from . import profiling
+
+
+########################## Render Plots ######################################################################
+def render(tasks, jobs=1):
+    """ Function to create plots given as (function, args, kwargs) tasks. With jobs > 1 the plots are created in a
+    pool of worker processes using the Agg backend, and their printed output is shown in task order. """
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            futures = [pool.submit(_render_task, func, args, kwargs, profiling.state()) for func, args, kwargs in tasks]
+            for future in futures:
+                log, records = future.result()
+                print(log, end='')
+                profiling.add(records)
+    else:
+        for func, args, kwargs in tasks:
+            with profiling.stage('plot', plot=_task_name(func)):
+                func(*args, **kwargs)
+
+
+def _task_name(func):
+    """ Returns the module and name of a plotting function for the profiling records. """
+    return func.__module__.split('.')[-1] + '.' + func.__name__
+
+
+def _render_task(func, args, kwargs, profile=(False, 0., '')):
+    """ Worker function for render which returns the printed output and profiling records of a plotting task. """
+    import matplotlib
+    matplotlib.use('Agg')
+    profiling.enable(*profile)
+    with profiling.stage('plot', plot=_task_name(func)):
+        _, log = profiling.captured(func, *args, **kwargs)
+    return log, profiling.take()
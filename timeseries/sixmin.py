@@ -0,0 +1,120 @@
+import os
+import glob
+import datetime as dt
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from . import loading, profiling
+
+
+# Six minute columns computed from the raw LiDAR data. The other columns come from other instruments, and l and l_ssh
+# need data which is not in the raw files, so they are left as they are (missing in new rows).
+lidar_columns = ['l_Hs', 'l_rpw', 'l_max', 'l_mean', 'l_median', 'l_min', 'l_n', 'l_skew', 'l_std']
+
+
+########################## Bin Raw LiDAR Data ################################################################
+def bin_day(data, day, seconds=360):
+    """ Function to compute the statistics of the range (in meters) and rpw of time sorted raw LiDAR columns of the
+    day starting at day in bins of seconds, as in ovavg_single: mean, median, standard deviation, skewness, count,
+    minimum, maximum, mean rpw and significant wave height (4 standard deviations). All bins are reduced at once over
+    the segments of the sorted records. Returns a dataframe indexed by the start time of each bin with data. """
+    time = data['time']
+    if len(time) == 0:
+        return pd.DataFrame(columns=lidar_columns, index=pd.DatetimeIndex([], name='time'), dtype=float)
+    r_range = data['range'] / 1000
+    bins = time // (seconds * 10000)
+    starts = np.concatenate([[0], np.flatnonzero(bins[1:] != bins[:-1]) + 1])
+    n = np.diff(np.append(starts, len(time)))
+    seg = np.repeat(np.arange(len(starts)), n)
+
+    mean = np.add.reduceat(r_range, starts) / n
+    dev = r_range - mean[seg]
+    m2 = np.add.reduceat(dev * dev, starts) / n
+    m3 = np.add.reduceat(dev * dev * dev, starts) / n
+    # The range is sorted within each bin for the medians
+    r_sorted = r_range[np.lexsort((r_range, seg))]
+    median = (r_sorted[starts + (n - 1) // 2] + r_sorted[starts + n // 2]) / 2
+    std = np.sqrt(m2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        skew = m3 / m2 ** 1.5
+
+    index = pd.DatetimeIndex(np.datetime64(day, 's') + bins[starts].astype(np.int64) * seconds, name='time')
+    return pd.DataFrame({'l_Hs': 4 * std, 'l_rpw': np.add.reduceat(data['rpw'].astype(float), starts) / n,
+                         'l_max': np.maximum.reduceat(r_range, starts), 'l_mean': mean, 'l_median': median,
+                         'l_min': np.minimum.reduceat(r_range, starts), 'l_n': n, 'l_skew': skew, 'l_std': std},
+                        index=index, columns=lidar_columns)
+
+
+def bin_file(d, rawdir, seconds=360):
+    """ Function to load the raw LiDAR day file of the day of d and bin it with bin_day. Returns None if there is no
+    day file. """
+    day = dt.datetime(d.year, d.month, d.day)
+    data = loading.load_raw(day, rawdir, frame=False)
+    if data is None:
+        return None
+    return bin_day(data, day, seconds)
+
+
+def _bin_file(d, rawdir, seconds):
+    """ Worker function for generate which returns the binned day and its printed output. """
+    return profiling.captured(bin_file, d, rawdir, seconds)
+
+
+########################## Write Monthly Files ###############################################################
+def merge_month(f, loc, binned):
+    """ Function to write the LiDAR columns of the binned six minute data into the monthly file f with the column
+    layout of load_output. The LiDAR columns are found by their position in the layout, as load_output reads them.
+    Rows of an existing file keep their other columns, including any after the layout, and new rows are added with
+    those missing. """
+    names = loading.names_harv_saved if loc == 'harv' else loading.names_cata_saved
+    if os.path.isfile(f):
+        data = pd.read_csv(f, header=0, parse_dates=True, index_col=0, na_values='   -   ',
+                           float_precision='round_trip')
+        data.index = pd.DatetimeIndex(data.index, name=data.index.name)
+        # A file with fewer columns than the layout gets the rest of them
+        for name in names[len(data.columns) + 1:]:
+            data[name] = np.nan
+    else:
+        data = pd.DataFrame(columns=names[1:], index=pd.DatetimeIndex([], name='time'), dtype=float)
+    columns = [data.columns[names.index(col) - 1] for col in lidar_columns]
+    data = data.reindex(data.index.union(binned.index))
+    data.loc[binned.index, columns] = binned[lidar_columns].to_numpy()
+    os.makedirs(os.path.dirname(os.path.abspath(f)), exist_ok=True)
+    data.to_csv(f + '.tmp', na_rep='   -   ', date_format='%Y-%m-%d %H:%M:%S')
+    os.replace(f + '.tmp', f)
+
+
+def generate(days, loc, rawdir, outdir, seconds=360, jobs=1):
+    """ Function to bin the raw LiDAR day files of days into six minute data and merge it into the monthly files
+    {loc}_%Y%m.csv in outdir. With jobs > 1 the days are binned in a pool of worker processes. """
+    days = sorted(days)
+    if jobs > 1 and len(days) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_bin_file, days, repeat(rawdir), repeat(seconds)))
+    else:
+        results = [_bin_file(d, rawdir, seconds) for d in days]
+
+    months = {}
+    for d, (binned, log) in zip(days, results):
+        print(log, end='')
+        if binned is None:
+            print('No LiDAR data for:', d.strftime('%Y-%m-%d'))
+            continue
+        for month, rows in binned.groupby(binned.index.strftime('%Y%m')):
+            months.setdefault(month, []).append(rows)
+    for month in sorted(months):
+        f = os.path.join(outdir, loc + '_' + month + '.csv')
+        binned = pd.concat(months[month])
+        merge_month(f, loc, binned[~binned.index.duplicated(keep='last')])
+        print('Wrote', len(binned), 'six minute intervals to:', f)
+
+
+def raw_days(rawdir, start=None, end=None):
+    """ Function to list the days of the raw LiDAR day files in rawdir between start and end (inclusive). """
+    days = set()
+    for f in glob.glob(os.path.join(rawdir, 'uls_*.bin.gz')) + glob.glob(os.path.join(rawdir, 'uls_*.bin.xz')):
+        d = dt.datetime.strptime(os.path.basename(f)[4:12], '%Y%m%d')
+        if (start is None or d >= start) and (end is None or d <= end):
+            days.add(d)
+    return sorted(days)
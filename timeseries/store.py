@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from . import profiling
+
+
+########################## Overflight Store ##################################################################
+class Store(object):
+    """ SQLite store of the averaged overflight data, with one value per site, mission, overflight time and method
+    (a column of the overflight file such as l_mean or bub), along with a row for every averaged overflight holding
+    its input file signature used by incremental loading, so overflights without any values are kept too. Times are
+    kept as microseconds since 1970 and the primary keys are indexes, so overflights are replaced one by one and a
+    time range is read without reading the rest of the history. """
+    def __init__(self, f):
+        self.f = f
+        os.makedirs(os.path.dirname(os.path.abspath(f)), exist_ok=True)
+        # Runs of several sites write at the same time, so a locked database is waited for
+        self.db = sqlite3.connect(f, timeout=60)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS overflights (site TEXT NOT NULL, mission TEXT NOT NULL, time INTEGER NOT NULL,
+                method TEXT NOT NULL, value REAL, PRIMARY KEY (site, mission, time, method)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS inputs (site TEXT NOT NULL, mission TEXT NOT NULL, time INTEGER NOT NULL,
+                inputs TEXT, PRIMARY KEY (site, mission, time)) WITHOUT ROWID;
+        ''')
+
+    def close(self):
+        self.db.close()
+
+    def upsert(self, site, mission, data, inputs=None):
+        """ Replaces the overflights in the dataframe data, indexed by time with one column per method, and their
+        input signatures from the series inputs (NULL without inputs), in one transaction. All values of a replaced
+        overflight are removed first, so methods it no longer has do not keep old values. Missing values are stored
+        as NULL. """
+        keys = [(site, mission, int(t)) for t in _micros(data.index)]
+        rows = [key + (str(col), None if np.isnan(v) else float(v))
+                for col in data.columns for key, v in zip(keys, data[col].to_numpy(dtype=float))]
+        signatures = [None] * len(keys) if inputs is None else [str(s) for s in inputs.reindex(data.index)]
+        with self.db:
+            self.db.executemany('DELETE FROM overflights WHERE site = ? AND mission = ? AND time = ?', keys)
+            self.db.executemany('INSERT INTO overflights VALUES (?, ?, ?, ?, ?)', rows)
+            self.db.executemany('INSERT OR REPLACE INTO inputs VALUES (?, ?, ?, ?)',
+                                [key + (s,) for key, s in zip(keys, signatures)])
+        print('Saved', len(keys), 'overflights to:', self.f)
+
+    def delete(self, site, mission, start=None, end=None):
+        """ Removes the overflights of a site and mission between start and end (inclusive). """
+        where, params = _range(site, mission, start, end)
+        with self.db:
+            self.db.execute('DELETE FROM overflights WHERE ' + where, params)
+            self.db.execute('DELETE FROM inputs WHERE ' + where, params)
+
+    def inputs(self, site, mission, times=None):
+        """ Returns the stored input signatures of a site and mission as a series indexed by time, reindexed to
+        times if given. """
+        where, params = _range(site, mission, *_bounds(times))
+        rows = self.db.execute('SELECT time, inputs FROM inputs WHERE ' + where + ' ORDER BY time', params).fetchall()
+        inputs = pd.Series([r[1] for r in rows], index=_times([r[0] for r in rows]), name='inputs', dtype=object)
+        if times is not None:
+            inputs = inputs.reindex(pd.DatetimeIndex(times).astype('datetime64[us]'))
+        return inputs
+
+    def query(self, site, mission, methods, start=None, end=None):
+        """ Reads the methods of the overflights of a site and mission between start and end (inclusive). Returns
+        the times of all averaged overflights as a datetime64 array and the methods as rows of a float array, NaN
+        where a value is missing. """
+        where, params = _range(site, mission, start, end)
+        time = self.db.execute('SELECT time FROM inputs WHERE ' + where + ' ORDER BY time', params).fetchall()
+        time = np.array([r[0] for r in time], dtype=np.int64)
+        where += ' AND method IN (' + ', '.join('?' * len(methods)) + ')'
+        rows = self.db.execute('SELECT time, method, value FROM overflights WHERE ' + where, params + list(methods))
+        rows = rows.fetchall()
+        profiling.count(rows=len(rows))
+        data = np.full((len(methods), len(time)), np.nan)
+        if rows:
+            t, method, value = zip(*rows)
+            order = {m: i for i, m in enumerate(methods)}
+            data[np.array([order[m] for m in method]), np.searchsorted(time, np.array(t, dtype=np.int64))] = \
+                np.array(value, dtype=float)
+        return time.astype('datetime64[us]'), data
+
+    def view(self, site, mission):
+        """ Returns the overflights of a site and mission as a source for the loaders. """
+        return View(self, site, mission)
+
+
+class View(object):
+    """ Overflights of one site and mission in a Store, read by loading.read_overflights in place of the overflight
+    file. """
+    def __init__(self, store, site, mission):
+        self.store = store
+        self.site = site
+        self.mission = mission
+
+    def read(self, columns, times=None):
+        """ Reads columns for the overflights at times, or all overflights. Returns the times and the columns as
+        rows of a float array. Overflights at times which are not stored are left out. """
+        time, data = self.store.query(self.site, self.mission, columns, *_bounds(times))
+        if times is not None:
+            keep = np.isin(time, np.asarray(times, dtype='datetime64[us]'))
+            time, data = time[keep], data[:, keep]
+        return time, data
+
+
+def _micros(times):
+    """ Microseconds since 1970 of times. """
+    return np.asarray(pd.DatetimeIndex(times).to_numpy(dtype='datetime64[us]')).astype(np.int64)
+
+
+def _times(micros):
+    """ DatetimeIndex of microseconds since 1970. """
+    return pd.DatetimeIndex(np.array(micros, dtype=np.int64).astype('datetime64[us]'), name='time')
+
+
+def _bounds(times):
+    """ First and last of times, or no bounds. """
+    if times is None or len(times) == 0:
+        return None, None
+    times = pd.DatetimeIndex(times)
+    return times.min(), times.max()
+
+
+def _range(site, mission, start, end):
+    """ SQL condition and parameters selecting a site and mission between start and end. """
+    where, params = 'site = ? AND mission = ?', [site, mission]
+    if start is not None:
+        where, params = where + ' AND time >= ?', params + [int(_micros([start])[0])]
+    if end is not None:
+        where, params = where + ' AND time <= ?', params + [int(_micros([end])[0])]
+    return where, params
@@ -0,0 +1,80 @@
+import os
+import glob
+import time
+import traceback
+
+
+########################## Watch Data Files ##################################################################
+def signatures(patterns):
+    """ Function to get the size and modification time of every file matching the glob patterns. """
+    sig = {}
+    for pattern in patterns:
+        for f in glob.glob(pattern):
+            try:
+                stat = os.stat(f)
+            except OSError:  # Removed since the glob
+                continue
+            sig[f] = (stat.st_size, stat.st_mtime_ns)
+    return sig
+
+
+class Watcher(object):
+    """ Polls the files matching glob patterns and reports the files which are new, changed or removed since they
+    were last used, once they have not changed for settle seconds. Files which are still being written keep
+    changing, so they are only reported after their transfer stops. """
+    def __init__(self, patterns, settle=20., clock=time.monotonic):
+        self.patterns = patterns
+        self.settle = settle
+        self.clock = clock
+        self.used = signatures(patterns)
+        self.pending = {}
+
+    def poll(self):
+        """ Returns the sorted names of the files which changed and have settled, and marks them as used. """
+        now = self.clock()
+        current = signatures(self.patterns)
+        ready = []
+        for f in set(current) | set(self.used):
+            sig = current.get(f)
+            if sig == self.used.get(f):
+                self.pending.pop(f, None)
+            elif f not in self.pending or self.pending[f][0] != sig:
+                self.pending[f] = (sig, now)
+            elif now - self.pending[f][1] >= self.settle:
+                ready.append(f)
+        for f in ready:
+            sig, _ = self.pending.pop(f)
+            if sig is None:
+                self.used.pop(f, None)
+            else:
+                self.used[f] = sig
+        return sorted(ready)
+
+
+def watch(patterns, process, interval=10., settle=20.):
+    """ Function to run process once and again every time files matching patterns have changed and settled, checking
+    every interval seconds until interrupted. Errors of a run are printed and the watch goes on. """
+    watcher = Watcher(patterns, settle)
+    _run(process)
+    print('Watching for new data every', interval, 'seconds. Press Ctrl+C to stop.')
+    try:
+        while True:
+            time.sleep(interval)
+            ready = watcher.poll()
+            if ready:
+                print('-------------------------------------')
+                print('New or changed data files:', ', '.join(os.path.basename(f) for f in ready))
+                start = time.time()
+                _run(process)
+                print('Updated in', round(time.time() - start, 1), 'seconds.')
+    except KeyboardInterrupt:
+        print('Stopped watching.')
+
+
+def _run(process):
+    """ Runs process, printing instead of raising its errors. The loaders stop with sys.exit on bad input, which
+    would end the watch, so that is reported as an error of the run as well. """
+    try:
+        process()
+    except (Exception, SystemExit):
+        traceback.print_exc()